@@ -0,0 +1,102 @@
+"""Measure event loop lag while chat consumers handle messages.
+
+A probe task sleeps for short intervals and records how late it wakes up,
+while clients send messages through ChatConsumer. Broker round trips are
+simulated with a sleep in the publisher connection, to compare publishing
+inline in the consumer with handing messages to BackgroundPublisher.
+
+Usage: python -m benchmarks.chat_loop_lag [--clients 20] [--broker-latency 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "moneymanager.settings")
+django.setup()
+
+from channels.testing import WebsocketCommunicator  # noqa: E402
+
+from accounts.models import Account  # noqa: E402
+from core.chat.consumers import ChatConsumer  # noqa: E402
+from core.services.notifications.messages import MessagesProducer  # noqa: E402
+from core.services.notifications.publishers import (  # noqa: E402
+    BackgroundPublisher,
+    ExchangeConfig,
+    PersistentPublisher,
+    PublisherConnection,
+)
+from moneymanager import services_container  # noqa: E402
+
+PROBE_INTERVAL = 0.001
+
+
+class SlowConnection(PublisherConnection):
+    def __init__(self, latency: float) -> None:
+        super().__init__(None)
+        self._latency = latency
+
+    def publish(self, exchange, messages) -> None:
+        time.sleep(self._latency)
+        messages.clear()
+
+
+async def probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def client(messages: int) -> None:
+    communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), "/")
+    communicator.scope["user"] = Account(username="benchmark")
+    await communicator.connect()
+    for number in range(messages):
+        await communicator.send_json_to({"message": f"Message {number}"})
+    await communicator.disconnect()
+
+
+async def run(clients: int, messages: int) -> tuple[list[float], float]:
+    lags = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(client(messages) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    return lags, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--broker-latency", type=float, default=5, help="ms")
+    args = parser.parse_args()
+    exchange = ExchangeConfig("messages_exchange", "topic")
+    connection = SlowConnection(args.broker_latency / 1000)
+    publishers = {
+        "inline": PersistentPublisher(connection, exchange),
+        "background": BackgroundPublisher(connection, exchange, 10_000),
+    }
+    for name, publisher in publishers.items():
+        services_container.override(MessagesProducer, MessagesProducer(publisher))
+        lags, elapsed = asyncio.run(run(args.clients, args.messages))
+        lags_ms = sorted(lag * 1000 for lag in lags)
+        total = args.clients * args.messages
+        print(
+            f"{name:<12} {total / elapsed:8.0f} msg/s"
+            f"  lag median {statistics.median(lags_ms):7.2f} ms"
+            f"  p99 {lags_ms[int(len(lags_ms) * 0.99)]:7.2f} ms"
+            f"  max {lags_ms[-1]:7.2f} ms"
+        )
+        services_container.reset_override()
+
+
+if __name__ == "__main__":
+    main()
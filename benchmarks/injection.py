@@ -0,0 +1,43 @@
+"""Measure per-call overhead of InjectionContainer.inject.
+
+Usage: python -m benchmarks.injection
+"""
+import timeit
+
+from moneymanager.utils import InjectionContainer
+
+
+class Service:
+    pass
+
+
+container = InjectionContainer()
+container[Service] = Service()
+
+
+def plain(amount: int, service: Service) -> int:
+    return amount
+
+
+injected = container.inject("service")(plain)
+service = container[Service]
+
+CASES = {
+    "plain call": lambda: plain(1, service),
+    "injected call": lambda: injected(1),
+    "injected call, explicit argument": lambda: injected(1, service),
+    "container lookup": lambda: container[Service],
+}
+
+
+def main(number: int = 1_000_000) -> None:
+    baseline = None
+    for name, statement in CASES.items():
+        elapsed = min(timeit.repeat(statement, number=number, repeat=5))
+        per_call = elapsed / number * 1e9
+        baseline = baseline or per_call
+        print(f"{name:<35} {per_call:8.1f} ns/call {per_call / baseline:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
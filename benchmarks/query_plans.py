@@ -0,0 +1,210 @@
+"""Record query plans and timings of the main transaction query shapes.
+
+Creates a throwaway test database the same way the test runner does, seeds
+a dataset into it and runs list, summary, stats, category transactions and
+CSV export requests against one of the accounts. With --compare the core app
+is migrated back to the given migration first, so plans before and after the
+indexes can be compared on the same data. The test database is destroyed
+afterwards, the configured one is never touched.
+
+Usage: python -m benchmarks.query_plans [--transactions N] [--compare 0015]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "moneymanager.settings")
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import DEFAULT_DB_ALIAS, connection  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext,
+    setup_databases,
+    teardown_databases,
+)
+from django.urls import resolve, reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+
+from accounts.models import Account  # noqa: E402
+from core.constants import TransactionType  # noqa: E402
+from core.transactions.models import (  # noqa: E402
+    Transaction,
+    TransactionCategory,
+    TransactionCategoryClosure,
+    TransactionRollup,
+)
+
+BATCH_SIZE = 2000
+DAYS = 730
+
+
+def seed(accounts: int, transactions: int, categories: int) -> Account:
+    """Create accounts with category trees and evenly spread transactions."""
+    now = timezone.now()
+    suffix = uuid.uuid4().hex[:8]
+    created_accounts = []
+    for number in range(accounts):
+        account = Account.objects.create_user(
+            f"benchmark_{suffix}_{number}", f"benchmark_{suffix}_{number}@example.org"
+        )
+        roots = TransactionCategory.objects.bulk_create(
+            TransactionCategory(
+                account=account,
+                name=f"Category {index}",
+                transaction_type=random.choice(TransactionType.values),
+            )
+            for index in range(categories)
+        )
+        TransactionCategoryClosure.objects.insert_categories(roots)
+        subcategories = TransactionCategory.objects.bulk_create(
+            TransactionCategory(
+                account=account,
+                parent_category=root,
+                name=f"{root.name}.{index}",
+                transaction_type=root.transaction_type,
+            )
+            for root in roots
+            for index in range(3)
+        )
+        TransactionCategoryClosure.objects.insert_categories(subcategories)
+        leaves = roots + subcategories
+        for start in range(0, transactions, BATCH_SIZE):
+            Transaction.objects.bulk_create(
+                Transaction(
+                    account=account,
+                    category=random.choice(leaves),
+                    amount=random.randint(1, 100_000),
+                    currency=account.default_currency,
+                    transaction_time=now
+                    - timedelta(seconds=random.randint(0, DAYS * 24 * 60 * 60)),
+                )
+                for _ in range(min(BATCH_SIZE, transactions - start))
+            )
+        created_accounts.append(account)
+    TransactionRollup.objects.rebuild([account.id for account in created_accounts])
+    return created_accounts[0]
+
+
+def cases(account: Account, transactions: int) -> dict[str, tuple[str, dict]]:
+    now = timezone.now()
+    time_range = {
+        "transaction_time_after": (now - timedelta(days=90, hours=5)).isoformat(),
+        "transaction_time_before": (now - timedelta(hours=3)).isoformat(),
+    }
+    root = account.transactioncategory_set.filter(parent_category=None).first()
+    return {
+        "list first page": (reverse("transaction-list"), {}),
+        "list deep page": (
+            reverse("transaction-list"),
+            {"offset": max(transactions - 100, 0)},
+        ),
+        "list cursor": (reverse("transaction-list"), {"cursor": ""}),
+        "list time range": (reverse("transaction-list"), time_range),
+        "category transactions": (
+            reverse("transaction-category-transactions", args=(root.id,)),
+            {},
+        ),
+        "summary": (reverse("transaction-summary"), time_range),
+        "stats": (reverse("transaction-category-stats"), time_range),
+        "csv export": (reverse("export-csv"), time_range),
+    }
+
+
+def request(account: Account, path: str, params: dict) -> None:
+    request = APIRequestFactory().get(path, params)
+    force_authenticate(request, account)
+    match = resolve(path)
+    response = match.func(request, **match.kwargs)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    elif hasattr(response, "render"):
+        response.render()
+
+
+def explain(sql: str) -> str:
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+        return "\n".join(" ".join(map(str, row)) for row in cursor.fetchall())
+
+
+def measure(account: Account, transactions: int, repeat: int) -> dict[str, dict]:
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    results = {}
+    for name, (path, params) in cases(account, transactions).items():
+        with CaptureQueriesContext(connection) as context:
+            request(account, path, params)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            request(account, path, params)
+            timings.append(time.perf_counter() - start)
+        results[name] = {
+            "median_ms": statistics.median(timings) * 1000,
+            "plans": [
+                explain(query["sql"])
+                for query in context.captured_queries
+                if query["sql"].startswith("SELECT")
+            ],
+        }
+    return results
+
+
+def report(title: str, results: dict[str, dict], baseline: dict | None) -> None:
+    print(f"\n=== {title} ===")
+    for name, result in results.items():
+        line = f"{name:<25} {result['median_ms']:10.2f} ms"
+        if baseline:
+            line += f"  ({baseline[name]['median_ms'] / result['median_ms']:.2f}x)"
+        print(line)
+    for name, result in results.items():
+        print(f"\n--- {name} ---")
+        print("\n\n".join(result["plans"]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=5)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--compare",
+        metavar="MIGRATION",
+        help="core migration to measure before the latest one",
+    )
+    args = parser.parse_args()
+    if connection.settings_dict["TEST"].get("NAME") == connection.settings_dict["NAME"]:
+        parser.error("test database name must differ from the configured one")
+    old_config = setup_databases(
+        verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS}
+    )
+    try:
+        run(args)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+def run(args: argparse.Namespace) -> None:
+    account = seed(args.accounts, args.transactions, args.categories)
+    baseline = None
+    if args.compare:
+        call_command("migrate", "core", args.compare, verbosity=0)
+        baseline = measure(account, args.transactions, args.repeat)
+        report(f"core {args.compare}", baseline, None)
+        call_command("migrate", "core", verbosity=0)
+    results = measure(account, args.transactions, args.repeat)
+    report("latest migrations", results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare payload size and encoding time of transaction event formats.
+
+Synthetic events are encoded with every encoder from ENCODERS and decoded
+back with decode_transactions.
+
+Usage: python -m benchmarks.wire_format [--transactions 1000] [--repeat 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "moneymanager.settings")
+django.setup()
+
+from core.services.notifications.encoders import (  # noqa: E402
+    ENCODERS,
+    decode_transactions,
+)
+
+
+def make_transactions(number: int) -> list[dict]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    transactions = []
+    for transaction_id in range(1, number + 1):
+        amount = random.randint(-100_000, 100_000) / 100
+        transactions.append(
+            {
+                "transaction_id": transaction_id,
+                "account_id": random.randint(1, 10),
+                "transaction_type": "OUT" if amount < 0 else "IN",
+                "amount": str(amount),
+                "transaction_time": (
+                    start + timedelta(minutes=transaction_id)
+                ).isoformat(),
+            }
+        )
+    return transactions
+
+
+def measure(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    transactions = make_transactions(args.transactions)
+    for name, encoder_class in ENCODERS.items():
+        encoder = encoder_class()
+        body = encoder.encode(transactions)
+        encode_ms = measure(lambda: encoder.encode(transactions), args.repeat)
+        decode_ms = measure(
+            lambda: decode_transactions(body, encoder.content_type), args.repeat
+        )
+        print(
+            f"{name:<14} {len(body):9d} bytes"
+            f"  encode {encode_ms:7.2f} ms  decode {decode_ms:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
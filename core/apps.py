@@ -1,6 +1,7 @@
 import pika
 from django.apps import AppConfig
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from pika import connection
 
 from moneymanager import (
@@ -9,16 +10,32 @@ from moneymanager import (
     services_container,
 )
 
+from .constants import HistoryMode
 from .services.currency import CurrencyConverter
+from .services.notifications.encoders import ENCODERS
 from .services.notifications.messages import MessagesProducer
-from .services.notifications.publishers import AsynchronousPublisher, ExchangeConfig
+from .services.notifications.publishers import (
+    BackgroundPublisher,
+    ExchangeConfig,
+    PersistentPublisher,
+    PublisherConnection,
+)
 from .services.notifications.rpc import RpcClientFactory
 from .services.notifications.transactions import TransactionsProducer
 from .services.notifications.users import UsersProducer, UsersRpcService
 from .services.rates_providers import BaseRates
 
 
+def _validate_settings():
+    if settings.HISTORY_MODE not in HistoryMode.values:
+        raise ImproperlyConfigured(
+            f"HISTORY_MODE must be one of: {', '.join(HistoryMode.values)}"
+        )
+
+
 def _wire_containers():
+    from .services.notifications.outbox import Outbox, OutboxPublisher
+
     if settings.RABBITMQ_URL:
         notifications_service_config[connection.Parameters] = pika.URLParameters(
             settings.RABBITMQ_URL
@@ -27,6 +44,8 @@ def _wire_containers():
         notifications_service_config[
             connection.Parameters
         ] = pika.ConnectionParameters()
+    notifications_service_config[PublisherConnection] = PublisherConnection()
+    notifications_service_config[Outbox] = Outbox()
 
     users_exchange = ExchangeConfig(
         name="users_exchange",
@@ -37,19 +56,20 @@ def _wire_containers():
     services_container.bind(BaseRates, settings.CURRENCY_RATES_PROVIDER)
     services_container[CurrencyConverter] = CurrencyConverter()
     services_container[TransactionsProducer] = TransactionsProducer(
-        AsynchronousPublisher(
+        OutboxPublisher(
             exchange=ExchangeConfig(
                 name="transactions_exchange",
                 exchange_type="topic",
                 durable=True,
             ),
-        )
+        ),
+        encoder=ENCODERS[settings.NOTIFICATIONS_TRANSACTIONS_ENCODING](),
     )
     services_container[UsersProducer] = UsersProducer(
-        AsynchronousPublisher(exchange=users_exchange)
+        PersistentPublisher(exchange=users_exchange)
     )
     services_container[MessagesProducer] = MessagesProducer(
-        AsynchronousPublisher(
+        BackgroundPublisher(
             exchange=ExchangeConfig(
                 name="messages_exchange",
                 exchange_type="topic",
@@ -73,5 +93,6 @@ class CoreConfig(AppConfig):
     name = "core"
 
     def ready(self):
+        _validate_settings()
         _wire_containers()
         _connect_signal_receivers()
@@ -1,6 +1,5 @@
 from uuid import uuid4
 
-from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
@@ -26,14 +25,14 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
     async def receive_json(self, content):
         if "message" not in content:
             return
-        user_info = await self.get_user_info()
+        user_info = self.get_user_info()
         message = SerializedMessage(
             message_id=str(uuid4()),
             message_text=content["message"],
             timestamp=timezone.now().timestamp(),
             **user_info,
         )
-        MessageCache(self.group_name).push(message)
+        await MessageCache(self.group_name).apush(message)
         await self.channel_layer.group_send(
             self.group_name,
             {
@@ -46,10 +45,8 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
     async def chat_message(self, event):
         await self.send_json(event)
 
-    async def get_user_info(self):
-        username = await database_sync_to_async(lambda: self.user.username)()
-        is_admin = await database_sync_to_async(lambda: self.user.is_superuser)()
+    def get_user_info(self):
         return {
-            "user": username,
-            "is_admin": is_admin,
+            "user": self.user.username,
+            "is_admin": self.user.is_superuser,
         }
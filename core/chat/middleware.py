@@ -1,14 +1,28 @@
+from typing import NamedTuple
 from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
-from django.db import close_old_connections
+from django.core.cache import cache
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
 
 
+class ChatUser(NamedTuple):
+    """Fields of the user needed by chat, cached between connections."""
+
+    id: int
+    username: str
+    is_superuser: bool
+
+    @property
+    def is_authenticated(self) -> bool:
+        return True
+
+
 class JWTAuthMiddleware:
     User = get_user_model()
 
@@ -16,7 +30,6 @@ class JWTAuthMiddleware:
         self.app = app
 
     async def __call__(self, scope, receive, send):
-        close_old_connections()
         try:
             jwt_token_list = parse_qs(scope["query_string"].decode("utf8")).get(
                 "token", None
@@ -34,6 +47,18 @@ class JWTAuthMiddleware:
         user_id = payload[api_settings.USER_ID_CLAIM]
         return user_id
 
+    async def get_user(self, user_id) -> ChatUser:
+        cache_key = f"chat_user_{user_id}"
+        user = await cache.aget(cache_key)
+        if user is None:
+            user = await self.load_user(user_id)
+            await cache.aset(cache_key, user, settings.CHAT_USER_CACHE_TIMEOUT)
+        return user
+
     @database_sync_to_async
-    def get_user(self, user_id):
-        return self.User.objects.get(id=user_id)
+    def load_user(self, user_id) -> ChatUser:
+        return ChatUser._make(
+            self.User.objects.values_list("id", "username", "is_superuser").get(
+                id=user_id
+            )
+        )
@@ -1,4 +1,5 @@
 from contextlib import asynccontextmanager
+from unittest.mock import patch
 
 from asgiref.sync import sync_to_async
 from channels.routing import URLRouter
@@ -8,13 +9,13 @@ from django.urls import path
 from rest_framework_simplejwt.tokens import AccessToken
 
 from accounts.tests.factories import AccountFactory
-from core.tests import MockPublishersMixin
+from core.tests import CacheClearMixin, MockPublishersMixin
 
 from ..consumers import ChatConsumer
 from ..middleware import JWTAuthMiddleware
 
 
-class ChatConsumerTests(MockPublishersMixin, TransactionTestCase):
+class ChatConsumerTests(CacheClearMixin, MockPublishersMixin, TransactionTestCase):
     def setUp(self):
         super().setUp()
         self.user = AccountFactory()
@@ -65,6 +66,24 @@ class ChatConsumerTests(MockPublishersMixin, TransactionTestCase):
             response = await self.communicator.receive_json_from()
             self.assertTrue(response["is_admin"])
 
+    async def test_cached_user(self):
+        """User must be loaded from database only once for repeated connects."""
+        with patch.object(
+            self.application, "load_user", wraps=self.application.load_user
+        ) as load_user_mock:
+            for _ in range(3):
+                async with self._connect(self.access_token):
+                    await self.communicator.send_json_to({"message": "Test message"})
+                    response = await self.communicator.receive_json_from()
+                    self.assertEqual(response["user"], self.user.username)
+        load_user_mock.assert_called_once_with(self.user.id)
+
+    async def test_deleted_user(self):
+        """Connection must be closed if user doesn't exist."""
+        await sync_to_async(self.user.delete)()
+        async with self._connect(self.access_token):
+            await self._test_receive_failed()
+
     async def _test_receive_failed(self):
         with self.assertRaises(AssertionError):
             await self.communicator.receive_from()
@@ -12,3 +12,9 @@ class CurrencyCode(models.TextChoices):
 class TransactionType(models.TextChoices):
     INCOME = "IN", _("Income")
     OUTCOME = "OUT", _("Outcome")
+
+
+class HistoryMode(models.TextChoices):
+    FULL = "full"
+    DIFF = "diff"
+    ASYNC = "async"
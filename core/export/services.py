@@ -1,24 +1,58 @@
 import csv
-from collections import deque
-from collections.abc import Iterable
-from dataclasses import asdict
-from typing import Generator
+import io
+import json
+import posixpath
+import tempfile
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+from typing import BinaryIO, Callable, Generator, TextIO
 
-from django.http import StreamingHttpResponse
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db.models import QuerySet
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
-from rest_framework.response import Response
+from iso4217 import Currency
+from rest_framework import serializers
 
-from ..transactions.models import Transaction
-from ..transactions.services import notify_transaction_changes
-from .serializers import CategoryJsonSerializer, TransacationCsvSerializer
-from .utils import CategoryImportContext, EchoBuffer
+from core.services.notifications.transactions import TransactionsProducer
+from moneymanager import services_container
+
+from ..constants import CurrencyCode
+from ..transactions.history import bulk_create_with_history
+from ..transactions.models import (
+    Transaction,
+    TransactionCategory,
+    TransactionCategoryClosure,
+    TransactionRollup,
+)
+from ..transactions.services import (
+    get_account_version,
+    invalidate_cached_responses,
+    notify_transaction_changes,
+)
+from .serializers import CategoryJsonSerializer
+from .utils import CategoryImportContext, JsonArrayReader, ParsedCategory
+
+CSV_CHUNK_SIZE = 2000
+
+JSON_CHUNK_SIZE = 2000
+
+_JSON_EXPORT_VERSION = 1
+
+IMPORT_BATCH_SIZE = 2000
+
+IMPORT_FLUSH_BYTES = 4 * 1024 * 1024
 
 
 def file_timestamp() -> str:
     return timezone.now().strftime(r"%Y_%m_%d-%H_%M_%S")
 
 
-def csv_generator(transactions: Iterable[Transaction]) -> Generator[str, None, None]:
+def csv_generator(
+    transactions: QuerySet[Transaction],
+) -> Generator[str, None, None]:
     fieldnames = (
         "category",
         "transaction_type",
@@ -27,14 +61,53 @@ def csv_generator(transactions: Iterable[Transaction]) -> Generator[str, None, N
         "transaction_time",
         "comment",
     )
-    writer = csv.DictWriter(EchoBuffer(), fieldnames)
-    yield writer.writeheader()
-    for entry in transactions:
-        row = TransacationCsvSerializer(entry).data
-        yield writer.writerow(row)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fieldnames)
+    yield _pop_buffer(buffer)
+    amount_divisors = {
+        currency_code: 10 ** Currency(currency_code).exponent
+        for currency_code in CurrencyCode
+    }
+    datetime_field = serializers.DateTimeField()
+    rows = transactions.values_list(
+        "category__name",
+        "category__transaction_type",
+        "currency",
+        "amount",
+        "transaction_time",
+        "comment",
+    ).iterator(CSV_CHUNK_SIZE)
+    while chunk := list(islice(rows, CSV_CHUNK_SIZE)):
+        writer.writerows(
+            (
+                category,
+                transaction_type,
+                currency,
+                f"{Decimal(amount) / amount_divisors[currency]:f}",
+                datetime_field.to_representation(transaction_time),
+                comment,
+            )
+            for (
+                category,
+                transaction_type,
+                currency,
+                amount,
+                transaction_time,
+                comment,
+            ) in chunk
+        )
+        yield _pop_buffer(buffer)
+
+
+def _pop_buffer(buffer: io.StringIO) -> str:
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
 
 
-def csv_response(transactions: Iterable[Transaction]) -> StreamingHttpResponse:
+def csv_response(transactions: QuerySet[Transaction]) -> StreamingHttpResponse:
     filename = f"Transactions-{file_timestamp()}.csv"
     return StreamingHttpResponse(
         csv_generator(transactions),
@@ -43,40 +116,203 @@ def csv_response(transactions: Iterable[Transaction]) -> StreamingHttpResponse:
     )
 
 
-def json_response(result: list) -> Response:
+def json_response(file_name: str) -> FileResponse:
     filename = f"Moneyger-{file_timestamp()}.json"
-    return Response(
-        result,
+    return FileResponse(
+        storages["exports"].open(file_name, "rb"),
+        as_attachment=True,
+        filename=filename,
         content_type="application/json",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
 
-def _import_categories(
-    categories_import_stack: deque[tuple[list, CategoryImportContext]]
-) -> None:
-    categories, context = categories_import_stack.pop()
-    serializer = CategoryJsonSerializer(
-        data=categories,
-        context=asdict(context),
-        many=True,
+def json_export_name(account_id: int) -> str:
+    """Return storage name of the export which changes along with account data."""
+    version = get_account_version(account_id)
+    return f"{account_id}/{_JSON_EXPORT_VERSION}-{version}.json"
+
+
+def save_json_export(account_id: int, file_name: str) -> str:
+    storage = storages["exports"]
+    with tempfile.TemporaryFile() as file:
+        text_file = io.TextIOWrapper(file, encoding="utf-8")
+        write_json_export(account_id, text_file)
+        text_file.detach()
+        file.seek(0)
+        saved_name = storage.save(file_name, File(file))
+    directory = posixpath.dirname(saved_name)
+    for stale_name in storage.listdir(directory)[1]:
+        stale_name = posixpath.join(directory, stale_name)
+        if stale_name != saved_name:
+            storage.delete(stale_name)
+    return saved_name
+
+
+def write_json_export(account_id: int, file: TextIO) -> None:
+    """Write categories tree in the format of CategoryJsonSerializer."""
+    subcategories = defaultdict(list)
+    for category in (
+        TransactionCategory.objects.filter(account=account_id)
+        .order_by("id")
+        .values(
+            "id",
+            "parent_category_id",
+            "transaction_type",
+            "name",
+            "display_order",
+            "icon",
+            "color",
+        )
+    ):
+        subcategories[category.pop("parent_category_id")].append(category)
+    categories_with_transactions = set(
+        Transaction.objects.filter(account=account_id)
+        .order_by()
+        .values_list("category", flat=True)
+        .distinct()
     )
-    serializer.is_valid(raise_exception=True)
-    created_categories = serializer.save()
-    for category_data, instance in zip(categories, created_categories):
-        categories_import_stack.append(
-            (
-                category_data["subcategories"],
-                CategoryImportContext(
-                    account=context.account,
-                    parent_category=instance,
-                ),
-            )
+    datetime_field = serializers.DateTimeField()
+
+    def write_categories(categories: list[dict]) -> None:
+        file.write("[")
+        for i, category in enumerate(categories):
+            if i:
+                file.write(", ")
+            category_id = category.pop("id")
+            file.write(json.dumps(category)[:-1])
+            file.write(', "subcategories": ')
+            write_categories(subcategories[category_id])
+            file.write(', "transactions": [')
+            if category_id in categories_with_transactions:
+                write_transactions(category_id)
+            file.write("]}")
+        file.write("]")
+
+    def write_transactions(category_id: int) -> None:
+        transactions = (
+            Transaction.objects.filter(category=category_id)
+            .order_by("id")
+            .values_list("currency", "amount", "transaction_time", "comment")
+            .iterator(JSON_CHUNK_SIZE)
         )
+        for i, (currency, amount, transaction_time, comment) in enumerate(transactions):
+            if i:
+                file.write(", ")
+            file.write(
+                json.dumps(
+                    {
+                        "currency": currency,
+                        "amount": amount,
+                        "transaction_time": datetime_field.to_representation(
+                            transaction_time
+                        ),
+                        "comment": comment,
+                    }
+                )
+            )
+
+    write_categories(subcategories[None])
+    file.flush()
+
+
+def _parse_categories(
+    categories: list, context: CategoryImportContext
+) -> list[list[ParsedCategory]]:
+    """Validate the whole categories forest and split it into tree levels."""
+    levels = []
+    siblings_lists = [(categories, context.parent_category)]
+    while siblings_lists:
+        level = []
+        next_siblings_lists = []
+        for siblings, parent_category in siblings_lists:
+            serializer = CategoryJsonSerializer(data=siblings, many=True)
+            serializer.is_valid(raise_exception=True)
+            for category_data, validated_data in zip(
+                siblings, serializer.validated_data
+            ):
+                transactions = validated_data.pop("transactions")
+                instance = TransactionCategory(
+                    account=context.account,
+                    parent_category=parent_category,
+                    **validated_data,
+                )
+                level.append(ParsedCategory(instance, transactions))
+                subcategories = category_data.get("subcategories")
+                if subcategories:
+                    next_siblings_lists.append((subcategories, instance))
+        levels.append(level)
+        siblings_lists = next_siblings_lists
+    return levels
 
 
-def add_categories_to_account(categories: list, context: CategoryImportContext) -> None:
-    categories_import_stack = deque([(categories, context)])
-    while categories_import_stack:
-        _import_categories(categories_import_stack)
+@services_container.inject("transactions_producer")
+def add_categories_to_account(
+    categories: list,
+    context: CategoryImportContext,
+    transactions_producer: TransactionsProducer,
+) -> None:
+    levels = _parse_categories(categories, context)
+    history_date = timezone.now()
+    for level in levels:
+        created_categories = bulk_create_with_history(
+            [category.instance for category in level],
+            TransactionCategory,
+            batch_size=IMPORT_BATCH_SIZE,
+            default_user=context.account,
+            default_date=history_date,
+        )
+        TransactionCategoryClosure.objects.insert_categories(created_categories)
+    created_transactions = bulk_create_with_history(
+        [
+            Transaction(
+                account=context.account,
+                category=category.instance,
+                **transaction_data,
+            )
+            for level in levels
+            for category in level
+            for transaction_data in category.transactions
+        ],
+        Transaction,
+        batch_size=IMPORT_BATCH_SIZE,
+        default_user=context.account,
+        default_date=history_date,
+    )
+    TransactionRollup.objects.add_transactions(created_transactions)
+    invalidate_cached_responses(context.account.id)
+    transactions_producer.add_transactions(created_transactions)
     notify_transaction_changes()
+
+
+def import_json_file(
+    file: BinaryIO,
+    context: CategoryImportContext,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Imports a JSON array of categories, reading at most a few MB at a time."""
+    imported = 0
+    batch = []
+    flushed_at = file.tell()
+    for category in JsonArrayReader(file):
+        batch.append(category)
+        if file.tell() - flushed_at < IMPORT_FLUSH_BYTES:
+            continue
+        imported = _flush_import_batch(batch, context, imported, progress)
+        flushed_at = file.tell()
+    if batch:
+        imported = _flush_import_batch(batch, context, imported, progress)
+    return imported
+
+
+def _flush_import_batch(
+    batch: list,
+    context: CategoryImportContext,
+    imported: int,
+    progress: Callable[[int], None] | None,
+) -> int:
+    add_categories_to_account(batch, context)
+    imported += len(batch)
+    batch.clear()
+    if progress:
+        progress(imported)
+    return imported
@@ -1,17 +1,46 @@
 from celery import shared_task
+from django.core.files.storage import storages
+from django.db import transaction
+from rest_framework import serializers
 
-from ..transactions.models import TransactionCategory
-from ..transactions.utils import subcategories_and_transactions_lookups
-from .serializers import CategoryJsonSerializer
+from accounts.models import Account
+
+from .services import import_json_file, json_export_name, save_json_export
+from .utils import CategoryImportContext, JsonParseError
 
 
 @shared_task
-def generate_json(account_id: int):
-    lookups = tuple(subcategories_and_transactions_lookups())
-    queryset = TransactionCategory.objects.filter(
-        account=account_id, parent_category__isnull=True
-    ).prefetch_related(*lookups)
-    return CategoryJsonSerializer(
-        queryset,
-        many=True,
-    ).data
+def generate_json(account_id: int) -> str:
+    file_name = json_export_name(account_id)
+    if storages["exports"].exists(file_name):
+        return file_name
+    return save_json_export(account_id, file_name)
+
+
+@shared_task(bind=True)
+def import_json(self, account_id: int, file_name: str) -> dict:
+    storage = storages["imports"]
+    context = CategoryImportContext(Account.objects.get(pk=account_id))
+    try:
+        with storage.open(file_name, "rb") as file, transaction.atomic():
+            total_bytes = file.size
+
+            def report_progress(imported: int) -> None:
+                if self.request.id:
+                    self.update_state(
+                        state="PROGRESS",
+                        meta={
+                            "categories": imported,
+                            "bytes_read": file.tell(),
+                            "total_bytes": total_bytes,
+                        },
+                    )
+
+            imported = import_json_file(file, context, report_progress)
+    except serializers.ValidationError as exc:
+        return {"errors": exc.detail}
+    except (JsonParseError, UnicodeDecodeError) as exc:
+        return {"errors": {"detail": f"JSON parse error - {exc}"}}
+    finally:
+        storage.delete(file_name)
+    return {"categories": imported}
@@ -1,23 +1,39 @@
-from datetime import timedelta
+import json
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
 from unittest.mock import patch
 from urllib.parse import quote
 
+from django.core.files.storage import storages
+from django.db.models import Prefetch
+from django.test import override_settings
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework import status
 
-from core.constants import CurrencyCode, TransactionType
-from core.tests import StopPatchersMixin
+from core.constants import CurrencyCode, HistoryMode, TransactionType
+from core.tests import StopPatchersMixin, TemporaryStoragesMixin
 from core.transactions.tests.base import BaseTestCase, BaseViewTestCase
 from core.transactions.tests.factories import AccountFactory
 
+from ...transactions.models import Transaction, TransactionCategory
+from ..serializers import CategoryJsonSerializer
 from ..tasks import generate_json
 
 
-class GenerateJsonTestCase(BaseTestCase):
+class TemporaryExportsStorageMixin(TemporaryStoragesMixin):
+    def _read_export(self, file_name):
+        with storages["exports"].open(file_name) as file:
+            return json.load(file)
+
+
+class GenerateJsonTestCase(TemporaryExportsStorageMixin, BaseTestCase):
+    def _generate_json(self):
+        return self._read_export(generate_json(self.account.id))
+
     def test_no_categories(self):
         """Must return empty list if there are no categories."""
-        result = generate_json(self.account.id)
+        result = self._generate_json()
         self.assertListEqual(result, [])
 
     def test_nested_categories(self):
@@ -28,7 +44,7 @@ class GenerateJsonTestCase(BaseTestCase):
                 3, parent_category=category
             ):
                 self.create_transactions_batch(10, category=subcategory)
-        result = generate_json(self.account.id)
+        result = self._generate_json()
         self.assertEqual(len(result), len(categories))
         for category in result:
             self.assertEqual(len(category["subcategories"]), 3)
@@ -36,15 +52,59 @@ class GenerateJsonTestCase(BaseTestCase):
             for subcategory in category["subcategories"]:
                 self.assertEqual(len(subcategory["transactions"]), 10)
 
+    def test_serializer_format(self):
+        """Result must be the same as CategoryJsonSerializer output."""
+        for category in self.create_categories_batch(2):
+            self.create_transactions_batch(3, category=category)
+            for subcategory in self.create_categories_batch(
+                2, parent_category=category
+            ):
+                self.create_transactions_batch(2, category=subcategory)
+        expected_result = CategoryJsonSerializer(
+            TransactionCategory.objects.filter(
+                account=self.account, parent_category__isnull=True
+            ).prefetch_related(
+                Prefetch("transactions", Transaction.objects.order_by("id")),
+                Prefetch(
+                    "subcategories__transactions", Transaction.objects.order_by("id")
+                ),
+            ),
+            many=True,
+        ).data
+        self.assertEqual(self._generate_json(), json.loads(json.dumps(expected_result)))
+
     def test_queries_number(self):
-        """Correct number of queries must be performed."""
+        """Transactions must be queried only for categories that have them."""
         for category in self.create_categories_batch(4):
             self.create_categories_batch(3, parent_category=category)
-        with self.assertNumQueries(5):
+            self.create_transactions_batch(3, category=category)
+        with self.assertNumQueries(6):
             generate_json(self.account.id)
 
-
-class ExportJsonViewTests(StopPatchersMixin, BaseViewTestCase):
+    def test_reuse_export(self):
+        """Export must be reused until account data changes."""
+        transaction = self.create_transaction()
+        file_name = generate_json(self.account.id)
+        self.assertEqual(generate_json(self.account.id), file_name)
+        transaction.comment = "Changed"
+        transaction.save()
+        new_file_name = generate_json(self.account.id)
+        self.assertNotEqual(new_file_name, file_name)
+        self.assertFalse(storages["exports"].exists(file_name))
+
+    @override_settings(HISTORY_MODE=HistoryMode.ASYNC)
+    def test_reuse_export_async_history(self):
+        """Export must be regenerated before asynchronous history is written."""
+        transaction = self.create_transaction()
+        file_name = generate_json(self.account.id)
+        transaction.comment = "Changed"
+        transaction.save()
+        self.assertNotEqual(generate_json(self.account.id), file_name)
+
+
+class ExportJsonViewTests(
+    TemporaryExportsStorageMixin, StopPatchersMixin, BaseViewTestCase
+):
     def setUp(self):
         super().setUp()
         self.generate_json_mock = patch(
@@ -53,9 +113,10 @@ class ExportJsonViewTests(StopPatchersMixin, BaseViewTestCase):
         self.generate_json_mock.delay.return_value.id = "id"
         self.result_mock = patch("core.export.views.AsyncResult").start()
         self.task_result_mock = self.result_mock.return_value
-        self.task_result_mock.result = []
+        self.task_result_mock.result = generate_json(self.account.id)
         self.task_result_mock.ready.return_value = False
         self.task_result_mock.failed.return_value = False
+        self.create_category()
 
     def test_unauthorized(self):
         """Try to get data without providing authorization credentials."""
@@ -86,7 +147,16 @@ class ExportJsonViewTests(StopPatchersMixin, BaseViewTestCase):
         self.task_result_mock.ready.return_value = True
         response = self.client.get(reverse("export-json"))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIsInstance(response.json(), list)
+        self.assertIsInstance(json.loads(b"".join(response.streaming_content)), list)
+
+    def test_existing_export(self):
+        """Must response existing export without running task."""
+        generate_json(self.account.id)
+        response = self.client.get(reverse("export-json"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["Content-Type"], "application/json")
+        self.assertIn("attachment", response.headers["Content-Disposition"])
+        self.generate_json_mock.delay.assert_not_called()
 
 
 class ExportCsvViewTests(BaseViewTestCase):
@@ -116,6 +186,24 @@ class ExportCsvViewTests(BaseViewTestCase):
                 row, r"^Expenses category,OUT,USD,[0-9]+(\.[0-9]+)?,.*\r\n$"
             )
 
+    def test_row_format(self):
+        """Amount and time must be formatted as in API responses."""
+        category = self.create_category(
+            name="Expenses", transaction_type=TransactionType.OUTCOME
+        )
+        self.create_transaction(
+            category=category,
+            currency=CurrencyCode.EUR,
+            amount=12340,
+            transaction_time=datetime(2023, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+            comment='Note, "quoted"',
+        )
+        rows = list(self._iter_csv_response())
+        self.assertEqual(
+            rows[1],
+            'Expenses,OUT,EUR,123.4,2023-01-02T03:04:05Z,"Note, ""quoted"""\r\n',
+        )
+
     def test_view_data_of_other_account(self):
         """Transactions that belong to another account mustn't be present."""
         self.create_transactions_batch(5, account=AccountFactory())
@@ -155,5 +243,5 @@ class ExportCsvViewTests(BaseViewTestCase):
         response = self.client.get(reverse("export-csv"))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.headers["Content-Type"], "text/csv")
-        for line in response.streaming_content:
-            yield line.decode()
+        content = b"".join(response.streaming_content).decode()
+        yield from content.splitlines(keepends=True)
@@ -1,11 +1,23 @@
+import io
+import json
 from copy import deepcopy
+from unittest.mock import MagicMock, call, patch
 
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase
 from django.urls import reverse
 from rest_framework import status
 
-from core.transactions.models import Transaction, TransactionCategory
-from core.transactions.tests.base import BaseViewTestCase
+from core.tests import StopPatchersMixin, TemporaryStoragesMixin
+from core.transactions.models import Transaction, TransactionCategory, TransactionRollup
+from core.transactions.tests.base import BaseTestCase, BaseViewTestCase
+from core.transactions.utils import get_all_subcategories, get_all_transactions
 
+from ..services import import_json_file
+from ..tasks import import_json
+from ..utils import CategoryImportContext, JsonArrayReader, JsonParseError
 from .constants import EXPORTED_CATEGORIES
 
 
@@ -65,4 +77,195 @@ class ImportJsonViewTests(BaseViewTestCase):
 
     def test_queries_number(self):
         """Correct number of queries must be performed."""
-        self._test_post_queries_number(5, reverse("import-json"), EXPORTED_CATEGORIES)
+        self._test_post_queries_number(17, reverse("import-json"), EXPORTED_CATEGORIES)
+
+    def test_queries_number_independent_of_size(self):
+        """Number of queries mustn't depend on number of transactions."""
+        categories = deepcopy(EXPORTED_CATEGORIES)
+        transactions = categories[1]["transactions"]
+        transactions.extend(deepcopy(transactions[0]) for _ in range(50))
+        self._test_post_queries_number(17, reverse("import-json"), categories)
+
+    def test_history(self):
+        """History records must be created for imported objects."""
+        self.client.post(reverse("import-json"), EXPORTED_CATEGORIES)
+        self.assertEqual(Transaction.history.filter(history_type="+").count(), 4)
+        self.assertEqual(
+            TransactionCategory.history.filter(history_user=self.account).count(), 8
+        )
+
+    def test_subcategories_tree(self):
+        """Imported subcategories must be found at any depth."""
+        self.client.post(reverse("import-json"), EXPORTED_CATEGORIES)
+        category = TransactionCategory.objects.get(name="Category 1")
+        self.assertEqual(get_all_subcategories(category).count(), 6)
+        self.assertEqual(get_all_transactions(category).count(), 2)
+
+    def test_rollups(self):
+        """Rollups of imported transactions must be created."""
+        self.client.post(reverse("import-json"), EXPORTED_CATEGORIES)
+        rollups = set(TransactionRollup.objects.values_list("category", "amount"))
+        TransactionRollup.objects.rebuild()
+        self.assertSetEqual(
+            rollups, set(TransactionRollup.objects.values_list("category", "amount"))
+        )
+
+    def test_invalid_nested_transaction(self):
+        """Nothing must be imported if any transaction is invalid."""
+        broken_data = deepcopy(EXPORTED_CATEGORIES)
+        subcategory = broken_data[0]["subcategories"][0]["subcategories"][0]
+        subcategory["transactions"][1]["amount"] = -1
+        response = self.client.post(reverse("import-json"), broken_data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(TransactionCategory.objects.exists())
+
+
+class JsonArrayReaderTests(SimpleTestCase):
+    def _read(self, data, read_size=1):
+        return list(JsonArrayReader(io.BytesIO(data), read_size))
+
+    def test_items(self):
+        """Items must be decoded regardless of read size."""
+        items = [{"a": '[],"ы', "b": [1, 2.5e3, None, True]}, 12345, "x" * 100, []]
+        data = json.dumps(items, ensure_ascii=False, indent=2).encode()
+        for read_size in (1, 3, 7, len(data)):
+            self.assertEqual(self._read(data, read_size), items)
+
+    def test_empty(self):
+        """Empty array must be decoded."""
+        self.assertEqual(self._read(b" [ ] "), [])
+
+    def test_invalid(self):
+        """Must raise an error if data isn't a valid JSON array."""
+        for data in (b"", b"{}", b"[1,", b"[1 2]", b"[1]x", b"[1, tru]"):
+            with self.subTest(data=data), self.assertRaises(JsonParseError):
+                self._read(data)
+
+
+class ImportJsonTaskTests(TemporaryStoragesMixin, BaseTestCase):
+    def _upload(self, data):
+        return storages["imports"].save(
+            f"{self.account.id}/upload.json", ContentFile(data)
+        )
+
+    def test_import(self):
+        """All categories must be imported and uploaded file removed."""
+        file_name = self._upload(json.dumps(EXPORTED_CATEGORIES).encode())
+        result = import_json(self.account.id, file_name)
+        self.assertEqual(result, {"categories": 2})
+        self.assertEqual(TransactionCategory.objects.count(), 8)
+        self.assertEqual(Transaction.objects.count(), 4)
+        self.assertFalse(storages["imports"].exists(file_name))
+
+    def test_atomic(self):
+        """Nothing must be imported if any category is invalid."""
+        broken_data = deepcopy(EXPORTED_CATEGORIES)
+        broken_data[1]["transaction_type"] = "invalid value"
+        file_name = self._upload(json.dumps(broken_data).encode())
+        with patch("core.export.services.IMPORT_FLUSH_BYTES", 1):
+            result = import_json(self.account.id, file_name)
+        self.assertIn("errors", result)
+        self.assertFalse(TransactionCategory.objects.exists())
+        self.assertFalse(storages["imports"].exists(file_name))
+
+    def test_invalid_json(self):
+        """Must return an error if file isn't a valid JSON array."""
+        file_name = self._upload(json.dumps(EXPORTED_CATEGORIES)[:-1].encode())
+        result = import_json(self.account.id, file_name)
+        self.assertIn("detail", result["errors"])
+        self.assertFalse(TransactionCategory.objects.exists())
+
+    def test_progress(self):
+        """Progress must be reported after each flushed batch."""
+        progress = MagicMock()
+        data = io.BytesIO(json.dumps(EXPORTED_CATEGORIES).encode())
+        with patch("core.export.services.IMPORT_FLUSH_BYTES", 1):
+            imported = import_json_file(
+                data, CategoryImportContext(self.account), progress
+            )
+        self.assertEqual(imported, 2)
+        self.assertEqual(progress.call_args_list, [call(1), call(2)])
+        self.assertEqual(TransactionCategory.objects.count(), 8)
+
+
+class ImportJsonAsyncViewTests(
+    TemporaryStoragesMixin, StopPatchersMixin, BaseViewTestCase
+):
+    def setUp(self):
+        super().setUp()
+        self.import_json_mock = patch("core.export.views.import_json").start()
+        self.import_json_mock.delay.return_value.id = "id"
+        self.result_mock = patch("core.export.views.AsyncResult").start()
+        self.task_result_mock = self.result_mock.return_value
+        self.task_result_mock.ready.return_value = False
+        self.task_result_mock.failed.return_value = False
+
+    def _post_file(self):
+        upload = SimpleUploadedFile(
+            "categories.json", json.dumps(EXPORTED_CATEGORIES).encode()
+        )
+        return self.client.post(
+            reverse("import-json-async"), {"file": upload}, format="multipart"
+        )
+
+    def test_unauthorized(self):
+        """Try to send data without providing authorization credentials."""
+        self._test_get_unauthorized(reverse("import-json-async"))
+
+    def test_upload(self):
+        """Uploaded file must be stored and passed to task."""
+        response = self._post_file()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        account_id, file_name = self.import_json_mock.delay.call_args.args
+        self.assertEqual(account_id, self.account.id)
+        with storages["imports"].open(file_name) as file:
+            self.assertEqual(json.load(file), EXPORTED_CATEGORIES)
+
+    def test_no_file(self):
+        """Must response an error if file wasn't submitted."""
+        response = self.client.post(
+            reverse("import-json-async"), {}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.import_json_mock.delay.assert_not_called()
+
+    def test_conflict(self):
+        """Mustn't start another import while previous one is running."""
+        self._post_file()
+        response = self._post_file()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.import_json_mock.delay.assert_called_once()
+
+    def test_status_not_found(self):
+        """Must response 404 if there is no import."""
+        response = self.client.get(reverse("import-json-async"))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_status_progress(self):
+        """Must response progress unless task is ready."""
+        self._post_file()
+        self.task_result_mock.state = "PROGRESS"
+        self.task_result_mock.info = {"categories": 1}
+        response = self.client.get(reverse("import-json-async"))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["progress"], {"categories": 1})
+
+    def test_status_result(self):
+        """Must response result once and forget the task."""
+        self._post_file()
+        self.task_result_mock.ready.return_value = True
+        self.task_result_mock.result = {"categories": 2}
+        response = self.client.get(reverse("import-json-async"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"categories": 2})
+        self.task_result_mock.forget.assert_called_once()
+        response = self.client.get(reverse("import-json-async"))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_status_errors(self):
+        """Must response validation errors of the import."""
+        self._post_file()
+        self.task_result_mock.ready.return_value = True
+        self.task_result_mock.result = {"errors": {"detail": "error"}}
+        response = self.client.get(reverse("import-json-async"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,9 +1,14 @@
 from django.urls import path
 
-from .views import ExportCsvView, ExportJsonView, ImportJsonView
+from .views import ExportCsvView, ExportJsonView, ImportJsonAsyncView, ImportJsonView
 
 urlpatterns = [
     path("import/json/", ImportJsonView.as_view(), name="import-json"),
+    path(
+        "import/json/async/",
+        ImportJsonAsyncView.as_view(),
+        name="import-json-async",
+    ),
     path("export/csv/", ExportCsvView.as_view(), name="export-csv"),
     path("export/json/", ExportJsonView.as_view(), name="export-json"),
 ]
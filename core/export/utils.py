@@ -1,16 +1,14 @@
+import codecs
+import json
 from dataclasses import dataclass
-from typing import NamedTuple, TypeVar
+from typing import Any, BinaryIO, Iterator, NamedTuple
 
 from accounts.models import Account
 
 from ..transactions.models import TransactionCategory
 
-T = TypeVar("T")
-
-
-class EchoBuffer:
-    def write(self, value: T) -> T:
-        return value
+JSON_READ_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
 
 
 @dataclass
@@ -22,3 +20,88 @@ class CategoryImportContext:
 class ParsedCategory(NamedTuple):
     instance: TransactionCategory
     transactions: list[dict]
+
+
+class JsonParseError(ValueError):
+    pass
+
+
+class JsonArrayReader:
+    """Decodes items of a top-level JSON array one at a time."""
+
+    def __init__(self, file: BinaryIO, read_size: int = JSON_READ_SIZE) -> None:
+        self._file = file
+        self._read_size = read_size
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._consumed = 0
+        self._eof = False
+
+    def __iter__(self) -> Iterator[Any]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._position += 1
+        else:
+            while True:
+                yield self._decode_item()
+                separator = self._expect(",]")
+                if separator == "]":
+                    break
+        if self._peek() is not None:
+            self._error("Extra data")
+
+    def _decode_item(self) -> Any:
+        self._peek()
+        read_size = self._read_size
+        while True:
+            try:
+                item, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError as exc:
+                # Grow reads so that large items are not decoded too many times.
+                read_size *= 2
+                if not self._read(read_size):
+                    self._error(exc.msg, exc.pos)
+                continue
+            if end == len(self._buffer) and self._read(read_size):
+                # A number may continue in the next chunk.
+                continue
+            self._position = end
+            return item
+
+    def _expect(self, symbols: str) -> str:
+        symbol = self._peek()
+        if symbol is None or symbol not in symbols:
+            self._error(f"Expecting {' or '.join(map(repr, symbols))}")
+        self._position += 1
+        return symbol
+
+    def _peek(self) -> str | None:
+        while True:
+            while (
+                self._position < len(self._buffer)
+                and self._buffer[self._position] in _WHITESPACE
+            ):
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                return None
+
+    def _read(self, size: int | None = None) -> bool:
+        if self._eof:
+            return False
+        chunk = self._file.read(size or self._read_size)
+        self._eof = not chunk
+        self._consumed += self._position
+        self._buffer = self._buffer[self._position :] + self._text_decoder.decode(
+            chunk, final=self._eof
+        )
+        self._position = 0
+        return not self._eof
+
+    def _error(self, message: str, position: int | None = None) -> None:
+        if position is None:
+            position = self._position
+        raise JsonParseError(f"{message}: char {self._consumed + position}")
@@ -1,14 +1,24 @@
+from uuid import uuid4
+
 from celery.result import AsyncResult
 from django.core.cache import cache
+from django.core.files.storage import storages
 from rest_framework import status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import GenericAPIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from ..transactions.filters import TransactionFilter
 from ..transactions.views import BaseViewMixin
-from .services import add_categories_to_account, csv_response, json_response
-from .tasks import generate_json
+from .services import (
+    add_categories_to_account,
+    csv_response,
+    json_export_name,
+    json_response,
+)
+from .tasks import generate_json, import_json
 from .utils import CategoryImportContext
 
 
@@ -18,6 +28,47 @@ class ImportJsonView(BaseViewMixin, APIView):
         return Response()
 
 
+class ImportJsonAsyncView(BaseViewMixin, APIView):
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        task_name = f"task_import_json_{request.user.id}"
+        task_id = cache.get(task_name)
+        if task_id and not AsyncResult(task_id).ready():
+            return Response(status=status.HTTP_409_CONFLICT)
+        upload = request.data.get("file")
+        if upload is None:
+            raise ValidationError({"file": "No file was submitted."})
+        file_name = storages["imports"].save(
+            f"{request.user.id}/{uuid4().hex}.json", upload
+        )
+        task = import_json.delay(request.user.id, file_name)
+        cache.set(task_name, task.id, None)
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+    def get(self, request):
+        task_name = f"task_import_json_{request.user.id}"
+        task_id = cache.get(task_name)
+        if not task_id:
+            raise NotFound()
+        task = AsyncResult(task_id)
+        if not task.ready():
+            progress = task.info if task.state == "PROGRESS" else None
+            return Response(
+                {"state": task.state, "progress": progress},
+                status=status.HTTP_202_ACCEPTED,
+            )
+        result = task.result
+        failed = task.failed()
+        cache.delete(task_name)
+        task.forget()
+        if failed:
+            raise result
+        if "errors" in result:
+            return Response(result["errors"], status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+
 class ExportCsvView(BaseViewMixin, GenericAPIView):
     filterset_class = TransactionFilter
 
@@ -34,19 +85,24 @@ class ExportCsvView(BaseViewMixin, GenericAPIView):
 
 class ExportJsonView(BaseViewMixin, APIView):
     def get(self, request):
+        storage = storages["exports"]
+        file_name = json_export_name(request.user.id)
+        if storage.exists(file_name):
+            return json_response(file_name)
         task_name = f"task_generate_json_{request.user.id}"
         task_id = cache.get(task_name)
-        if not task_id:
-            task = generate_json.delay(request.user.id)
-            cache.set(task_name, task.id)
-            return Response(status=status.HTTP_202_ACCEPTED)
-        task = AsyncResult(task_id)
-        if task.ready():
+        if task_id:
+            task = AsyncResult(task_id)
+            if not task.ready():
+                return Response(status=status.HTTP_202_ACCEPTED)
             result = task.result
             failed = task.failed()
             cache.delete(task_name)
             task.forget()
             if failed:
                 raise result
-            return json_response(result)
+            if storage.exists(result):
+                return json_response(result)
+        task = generate_json.delay(request.user.id)
+        cache.set(task_name, task.id)
         return Response(status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from core.transactions.history import compact_history
+
+
+class Command(BaseCommand):
+    help = "Delete history older than retention period, keeping last object states"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Retention period, defaults to HISTORY_RETENTION_DAYS setting",
+        )
+
+    def handle(self, *args, **options) -> str | None:
+        days = options["days"]
+        if days is None:
+            days = settings.HISTORY_RETENTION_DAYS
+        deleted_count = compact_history(timezone.now() - timedelta(days=days))
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted_count} historical records")
+        )
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.services.notifications.outbox import Outbox
+from moneymanager import notifications_service_config
+
+
+class Command(BaseCommand):
+    help = "Publish notifications stored in the outbox"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep polling the outbox with provided interval in seconds",
+        )
+
+    @notifications_service_config.inject("outbox")
+    def handle(self, outbox: Outbox, *args, **options) -> str | None:
+        while True:
+            published_count = outbox.drain(options["batch_size"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Published {published_count} messages")
+            )
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from core.transactions.models import TransactionRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild transaction rollups from scratch"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("account_ids", nargs="*", type=int)
+
+    def handle(self, *args, **options) -> str | None:
+        rollups_count = TransactionRollup.objects.rebuild(
+            options["account_ids"] or None
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {rollups_count} rollups"))
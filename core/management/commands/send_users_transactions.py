@@ -1,3 +1,6 @@
+import time
+from itertools import islice
+
 from django.core.management.base import BaseCommand, CommandParser
 
 from core.services.notifications.transactions import TransactionsProducer
@@ -10,6 +13,11 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument("account_ids", nargs="+", type=int)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Stream transactions and send them in messages of provided size",
+        )
 
     @services_container.inject("transactions_producer")
     def handle(
@@ -19,7 +27,39 @@ class Command(BaseCommand):
         **options,
     ) -> str | None:
         account_ids = options["account_ids"]
+        chunk_size = options["chunk_size"]
         transactions = Transaction.objects.filter(account_id__in=account_ids)
-        transactions_producer.add_transactions(transactions).send()
-        transaction_count = len(transactions)
-        self.stdout.write(self.style.SUCCESS(f"Sent {transaction_count} transactions"))
+        start_time = time.perf_counter()
+        if chunk_size:
+            transaction_count = self._send_chunks(
+                transactions_producer,
+                transactions,
+                chunk_size,
+                options["verbosity"],
+            )
+        else:
+            transactions_producer.add_transactions(transactions).send()
+            transaction_count = len(transactions)
+        elapsed_time = max(time.perf_counter() - start_time, 1e-6)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {transaction_count} transactions in {elapsed_time:.2f}s "
+                f"({transaction_count / elapsed_time:.0f} transactions/s)"
+            )
+        )
+
+    def _send_chunks(
+        self,
+        transactions_producer: TransactionsProducer,
+        transactions,
+        chunk_size: int,
+        verbosity: int,
+    ) -> int:
+        transaction_count = 0
+        transactions_iterator = transactions.order_by("id").iterator(chunk_size)
+        while chunk := list(islice(transactions_iterator, chunk_size)):
+            transactions_producer.add_transactions(chunk).send()
+            transaction_count += len(chunk)
+            if verbosity > 1:
+                self.stdout.write(f"Sent {transaction_count} transactions")
+        return transaction_count
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_category_closure(apps, schema_editor):
+    TransactionCategory = apps.get_model("core", "TransactionCategory")
+    TransactionCategoryClosure = apps.get_model("core", "TransactionCategoryClosure")
+    parents = dict(TransactionCategory.objects.values_list("id", "parent_category"))
+    closure = []
+    for category_id in parents:
+        ancestor_id, depth = category_id, 0
+        while ancestor_id is not None:
+            closure.append(
+                TransactionCategoryClosure(
+                    ancestor_id=ancestor_id,
+                    descendant_id=category_id,
+                    depth=depth,
+                )
+            )
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    TransactionCategoryClosure.objects.bulk_create(closure, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0012_alter_historicaltransaction_transaction_time_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionCategoryClosure",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("depth", models.PositiveIntegerField()),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="core.transactioncategory",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="core.transactioncategory",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="transactioncategoryclosure",
+            constraint=models.UniqueConstraint(
+                fields=("ancestor", "descendant"), name="unique_category_closure"
+            ),
+        ),
+        migrations.RunPython(build_category_closure, migrations.RunPython.noop),
+    ]
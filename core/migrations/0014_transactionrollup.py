@@ -0,0 +1,91 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:13
+
+from datetime import timezone
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    Transaction = apps.get_model("core", "Transaction")
+    TransactionRollup = apps.get_model("core", "TransactionRollup")
+    TransactionRollup.objects.bulk_create(
+        (
+            TransactionRollup(**values)
+            for values in Transaction.objects.order_by()
+            .values(
+                "account_id",
+                "category_id",
+                "currency",
+                day=TruncDate("transaction_time", tzinfo=timezone.utc),
+            )
+            .annotate(amount=Sum("amount"), transaction_count=Count("id"))
+            .iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("core", "0013_transactioncategoryclosure"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("USD", "Usd"),
+                            ("EUR", "Eur"),
+                            ("BYN", "Byn"),
+                            ("RUB", "Rub"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("amount", models.BigIntegerField(default=0)),
+                ("transaction_count", models.IntegerField(default=0)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups",
+                        to="core.transactioncategory",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="transactionrollup",
+            constraint=models.UniqueConstraint(
+                fields=("account", "category", "currency", "day"),
+                name="unique_transaction_rollup",
+            ),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
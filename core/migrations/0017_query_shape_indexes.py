@@ -0,0 +1,78 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:06
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0016_transaction_account_time_id_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="historicaltransaction",
+            name="transaction_time",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                validators=[
+                    django.core.validators.MaxValueValidator(django.utils.timezone.now)
+                ],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="category",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="transactions",
+                to="core.transactioncategory",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="transaction_time",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                validators=[
+                    django.core.validators.MaxValueValidator(django.utils.timezone.now)
+                ],
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transactionrollup",
+            name="category",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="rollups",
+                to="core.transactioncategory",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["category", "transaction_time"],
+                name="transaction_category_time",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactioncategory",
+            index=models.Index(
+                condition=models.Q(("parent_category__isnull", True)),
+                fields=["account", "display_order"],
+                name="category_root_account_order",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionrollup",
+            index=models.Index(fields=["account", "day"], name="rollup_account_day"),
+        ),
+        migrations.AddIndex(
+            model_name="transactionrollup",
+            index=models.Index(fields=["category", "day"], name="rollup_category_day"),
+        ),
+    ]
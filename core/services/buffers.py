@@ -0,0 +1,42 @@
+from collections.abc import Callable
+from typing import TypeVar
+
+from django.db import transaction
+
+T = TypeVar("T", bound=Callable[[], None])
+
+
+def transaction_buffer(name: str, factory: Callable[[], T], using=None) -> T | None:
+    """Return buffer bound to the current database transaction.
+
+    Buffer is registered as on_commit callback, so a new one is created once
+    the previous is committed or rolled back. Return None in autocommit mode.
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return None
+    buffer = getattr(connection, name, None)
+    if buffer is None or not any(
+        callback is buffer for _, callback, _ in connection.run_on_commit
+    ):
+        buffer = factory()
+        setattr(connection, name, buffer)
+        transaction.on_commit(buffer, using=using)
+    return buffer
+
+
+def register_batch(name: str, batch: Callable[[], None], using=None) -> None:
+    """Register batch as on_commit callback of the current savepoint.
+
+    Batch is dropped together with its callback if the savepoint is rolled back.
+    """
+    transaction.on_commit(batch, using=using)
+    connection = transaction.get_connection(using)
+    setattr(connection, name, active_batches(name, using) + [batch])
+
+
+def active_batches(name: str, using=None) -> list:
+    """Return batches of the current transaction that weren't rolled back."""
+    connection = transaction.get_connection(using)
+    registered = {id(callback) for _, callback, _ in connection.run_on_commit}
+    return [batch for batch in getattr(connection, name, ()) if id(batch) in registered]
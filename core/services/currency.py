@@ -1,11 +1,14 @@
+import time
+from collections.abc import Iterable
 from decimal import Decimal
+from typing import NamedTuple
 
 from iso4217 import Currency
 
 from moneymanager import services_container
 
 from ..constants import CurrencyCode
-from .rates_providers import BaseRates
+from .rates_providers import BaseRates, seconds_to_midnight
 
 
 def int_to_decimal(value: int, currency_code: CurrencyCode) -> Decimal:
@@ -18,10 +21,18 @@ def decimal_to_int(value: Decimal, currency_code: CurrencyCode) -> int:
     return round(value * 10**decimal_places)
 
 
+class _RatesTable(NamedTuple):
+    rates: dict[tuple[CurrencyCode, CurrencyCode], Decimal]
+    expires_at: float
+
+
 class CurrencyConverter:
     @services_container.inject("rates_provider")
     def __init__(self, rates_provider: BaseRates) -> None:
         self._rates_provider = rates_provider
+        self._table = _RatesTable({}, 0)
+        self.hits = 0
+        self.misses = 0
 
     @property
     def rates_provider(self) -> BaseRates:
@@ -30,9 +41,40 @@ class CurrencyConverter:
     @rates_provider.setter
     def rates_provider(self, provider: BaseRates) -> None:
         self._rates_provider = provider
+        self._table = _RatesTable({}, 0)
+
+    def get_rate(self, cur_from: CurrencyCode, cur_to: CurrencyCode) -> Decimal:
+        rates = self._get_table().rates
+        try:
+            rate = rates[cur_from, cur_to]
+        except KeyError:
+            self.misses += 1
+            rate = rates[cur_from, cur_to] = self._rates_provider.get_rate(
+                cur_from, cur_to
+            )
+        else:
+            self.hits += 1
+        return rate
 
     def convert(
         self, amount: Decimal, cur_from: CurrencyCode, cur_to: CurrencyCode
     ) -> Decimal | int:
-        rate = self._rates_provider.get_rate(cur_from, cur_to)
+        rate = self.get_rate(cur_from, cur_to)
         return round(amount * rate, Currency(cur_to).exponent)
+
+    def convert_many(
+        self,
+        amounts: Iterable[Decimal],
+        cur_from: CurrencyCode,
+        cur_to: CurrencyCode,
+    ) -> list[Decimal | int]:
+        rate = self.get_rate(cur_from, cur_to)
+        exponent = Currency(cur_to).exponent
+        return [round(amount * rate, exponent) for amount in amounts]
+
+    def _get_table(self) -> _RatesTable:
+        table = self._table
+        now = time.monotonic()
+        if now >= table.expires_at:
+            table = self._table = _RatesTable({}, now + seconds_to_midnight())
+        return table
@@ -1,11 +1,19 @@
+import functools
+import json
+import threading
 from collections import deque
 from typing import TypedDict
 
+import redis
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
 
 _DEFAULT_CACHE_NAME = "default"
 
+_local_push_lock = threading.Lock()
+
 
 class SerializedMessage(TypedDict):
     message_id: str
@@ -16,25 +24,68 @@ class SerializedMessage(TypedDict):
 
 
 class MessageCache:
+    """Recent messages of a chat group.
+
+    Redis cache keeps them in a list which is appended and trimmed atomically,
+    other backends store a deque that is only safe within a single process.
+    The list has its own key, since older releases pickled a deque into Redis.
+    """
+
     def __init__(self, group_name: str, cache_name: str = _DEFAULT_CACHE_NAME):
         self._cache_key = f"{group_name}_messages"
+        self._list_key = f"{self._cache_key}:v2"
+        self._cache_name = cache_name
         self._cache = caches[cache_name]
+        self._size_limit = settings.CHAT_CACHE_SIZE_LIMIT
 
     def get_all(self) -> deque[SerializedMessage]:
+        if isinstance(self._cache, RedisCache):
+            values = self._redis_client().lrange(
+                self._redis_key(), 0, self._size_limit - 1
+            )
+            return deque(map(json.loads, reversed(values)), maxlen=self._size_limit)
         recent_messages = self._cache.get(
-            self._cache_key, deque(maxlen=settings.CHAT_CACHE_SIZE_LIMIT)
+            self._cache_key, deque(maxlen=self._size_limit)
         )
         return recent_messages
 
     def push(self, message: SerializedMessage) -> SerializedMessage:
-        recent_messages: deque = self._cache.get_or_set(
-            self._cache_key,
-            deque(maxlen=settings.CHAT_CACHE_SIZE_LIMIT),
-            timeout=None,
-        )
-        recent_messages.append(message)
-        self._cache.set(self._cache_key, recent_messages, timeout=None)
+        if isinstance(self._cache, RedisCache):
+            key = self._redis_key()
+            with self._redis_client().pipeline() as pipeline:
+                pipeline.lpush(key, json.dumps(message))
+                pipeline.ltrim(key, 0, self._size_limit - 1)
+                pipeline.execute()
+            return message
+        with _local_push_lock:
+            recent_messages: deque = self._cache.get_or_set(
+                self._cache_key,
+                deque(maxlen=self._size_limit),
+                timeout=None,
+            )
+            recent_messages.append(message)
+            self._cache.set(self._cache_key, recent_messages, timeout=None)
         return message
 
+    async def apush(self, message: SerializedMessage) -> SerializedMessage:
+        """Push from a worker thread, so that event loop isn't blocked by cache I/O."""
+        return await sync_to_async(self.push, thread_sensitive=False)(message)
+
     def clear(self):
-        self._cache.delete(self._cache_key)
+        self._cache.delete_many([self._cache_key, self._list_key])
+
+    def _redis_key(self) -> str:
+        return self._cache.make_and_validate_key(self._list_key)
+
+    def _redis_client(self) -> redis.Redis:
+        location = settings.CACHES[self._cache_name]["LOCATION"]
+        if isinstance(location, str):
+            location = location.split(",")
+        # The first server is the primary one, lists are read from it as well
+        # to see own writes.
+        return _get_redis_client(location[0])
+
+
+@functools.cache
+def _get_redis_client(url: str) -> redis.Redis:
+    return redis.Redis.from_url(url)
@@ -0,0 +1,102 @@
+"""Wire formats of transaction events.
+
+Columnar formats store every field once as a list of values. Transaction type
+is dropped, since it is already encoded in the sign of the amount.
+"""
+import json
+from typing import Protocol
+
+import msgpack
+
+COLUMNAR_VERSION = 1
+
+_COLUMNS = ("transaction_id", "account_id", "amount", "transaction_time")
+
+
+class TransactionsEncoder(Protocol):
+    content_type: str
+
+    def encode(self, transactions: list[dict]) -> str | bytes:
+        ...
+
+    def encode_ids(self, transaction_ids: list[int]) -> str | bytes:
+        ...
+
+
+class JsonEncoder:
+    """List of transaction objects, the original format."""
+
+    content_type = "application/json"
+
+    def encode(self, transactions: list[dict]) -> str:
+        return json.dumps(transactions)
+
+    def encode_ids(self, transaction_ids: list[int]) -> str:
+        return json.dumps(transaction_ids)
+
+
+class ColumnarJsonEncoder:
+    content_type = "application/vnd.moneyger.columnar+json"
+
+    def encode(self, transactions: list[dict]) -> str:
+        return self._dumps(_to_columns(transactions))
+
+    def encode_ids(self, transaction_ids: list[int]) -> str:
+        return self._dumps(_ids_to_columns(transaction_ids))
+
+    def _dumps(self, columns: dict) -> str:
+        return json.dumps(columns, separators=(",", ":"))
+
+
+class MsgpackEncoder:
+    content_type = "application/vnd.moneyger.columnar+msgpack"
+
+    def encode(self, transactions: list[dict]) -> bytes:
+        return msgpack.packb(_to_columns(transactions))
+
+    def encode_ids(self, transaction_ids: list[int]) -> bytes:
+        return msgpack.packb(_ids_to_columns(transaction_ids))
+
+
+ENCODERS: dict[str, type[TransactionsEncoder]] = {
+    "json": JsonEncoder,
+    "columnar-json": ColumnarJsonEncoder,
+    "msgpack": MsgpackEncoder,
+}
+
+
+def decode_transactions(body: str | bytes, content_type: str | None) -> list:
+    """Decode message body of any format into the original list layout."""
+    if content_type == MsgpackEncoder.content_type:
+        columns = msgpack.unpackb(body)
+    elif content_type == ColumnarJsonEncoder.content_type:
+        columns = json.loads(body)
+    else:
+        return json.loads(body)
+    if columns.get("version") != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar version: {columns.get('version')}")
+    if "amount" not in columns:
+        return columns["transaction_id"]
+    return [
+        {
+            "transaction_id": transaction_id,
+            "account_id": account_id,
+            "transaction_type": "OUT" if amount.startswith("-") else "IN",
+            "amount": amount,
+            "transaction_time": transaction_time,
+        }
+        for transaction_id, account_id, amount, transaction_time in zip(
+            *(columns[column] for column in _COLUMNS)
+        )
+    ]
+
+
+def _to_columns(transactions: list[dict]) -> dict:
+    columns = {"version": COLUMNAR_VERSION}
+    for column in _COLUMNS:
+        columns[column] = [transaction[column] for transaction in transactions]
+    return columns
+
+
+def _ids_to_columns(transaction_ids: list[int]) -> dict:
+    return {"version": COLUMNAR_VERSION, "transaction_id": list(transaction_ids)}
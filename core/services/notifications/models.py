@@ -0,0 +1,9 @@
+from django.db import models
+
+
+class OutboxMessage(models.Model):
+    exchange = models.CharField(max_length=255)
+    routing_key = models.CharField(max_length=255)
+    body = models.BinaryField()
+    content_type = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
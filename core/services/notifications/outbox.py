@@ -0,0 +1,131 @@
+import logging
+from collections import deque
+from collections.abc import Callable
+from functools import partial
+from itertools import groupby
+from operator import attrgetter
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+
+from moneymanager import notifications_service_config
+
+from ..buffers import transaction_buffer
+from .models import OutboxMessage
+from .publishers import ExchangeConfig, PublisherConnection, PublisherMessage
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """Relays messages stored in the database to RabbitMQ."""
+
+    @notifications_service_config.inject("publisher_connection")
+    def __init__(self, publisher_connection: PublisherConnection) -> None:
+        self._connection = publisher_connection
+        self._exchanges: dict[str, ExchangeConfig] = {}
+
+    def register_exchange(self, exchange: ExchangeConfig) -> None:
+        self._exchanges[exchange.name] = exchange
+
+    def notify(self) -> None:
+        try:
+            drain_outbox.delay()
+        except Exception:
+            logger.exception("Failed to schedule outbox draining")
+
+    def drain(self, batch_size: int | None = None) -> int:
+        """Publish stored messages in batches, return number of published ones."""
+        batch_size = batch_size or settings.NOTIFICATIONS_OUTBOX_BATCH_SIZE
+        published_count = 0
+        while batch_count := self._drain_batch(batch_size):
+            published_count += batch_count
+        return published_count
+
+    @transaction.atomic
+    def _drain_batch(self, batch_size: int) -> int:
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True).order_by("id")[
+                :batch_size
+            ]
+        )
+        for exchange_name, exchange_messages in groupby(
+            messages, attrgetter("exchange")
+        ):
+            self._connection.publish(
+                self._exchanges[exchange_name],
+                deque(
+                    PublisherMessage(
+                        message.routing_key,
+                        bytes(message.body),
+                        message.content_type or None,
+                    )
+                    for message in exchange_messages
+                ),
+            )
+        OutboxMessage.objects.filter(
+            id__in=[message.id for message in messages]
+        ).delete()
+        return len(messages)
+
+
+class OutboxPublisher:
+    """Stores messages in the current database transaction."""
+
+    @notifications_service_config.inject("outbox")
+    def __init__(self, outbox: Outbox, exchange: ExchangeConfig) -> None:
+        self._outbox = outbox
+        self._exchange = exchange
+        self._message_queue: deque[PublisherMessage] = deque()
+        self._notify_name = f"outbox_notify_{id(self)}"
+        outbox.register_exchange(exchange)
+
+    def add_message(self, message: PublisherMessage) -> None:
+        self._message_queue.append(message)
+
+    def publish(self) -> None:
+        messages = []
+        while self._message_queue:
+            messages.append(self._message_queue.popleft())
+        if self._store(messages):
+            transaction.on_commit(self._outbox.notify)
+
+    def stage(self, messages: list[PublisherMessage]) -> list[int]:
+        """Store messages in the current transaction, return ids of the rows."""
+        rows = self._store(messages)
+        # Draining is scheduled once per transaction, right away in autocommit.
+        if rows and transaction_buffer(self._notify_name, self._new_notify) is None:
+            self._outbox.notify()
+        return [row.id for row in rows]
+
+    def replace(self, ids: list[int], messages: list[PublisherMessage]) -> list[int]:
+        """Replace staged rows, that weren't published yet, with new messages."""
+        OutboxMessage.objects.filter(id__in=ids).delete()
+        return self.stage(messages)
+
+    def _new_notify(self) -> Callable[[], None]:
+        return partial(self._outbox.notify)
+
+    def _store(self, messages: list[PublisherMessage]) -> list[OutboxMessage]:
+        rows = []
+        for message in messages:
+            body = message.body
+            if isinstance(body, str):
+                body = body.encode()
+            rows.append(
+                OutboxMessage(
+                    exchange=self._exchange.name,
+                    routing_key=message.routing_key,
+                    body=body,
+                    content_type=message.content_type or "",
+                )
+            )
+        if rows:
+            OutboxMessage.objects.bulk_create(rows)
+        return rows
+
+
+@shared_task
+def drain_outbox() -> int:
+    return notifications_service_config[Outbox].drain()
@@ -1,11 +1,16 @@
 import logging
+import os
+import queue
+import threading
+import time
 from collections import deque
 from dataclasses import dataclass
-from typing import Literal, Protocol, TypeVar
+from typing import Literal, Protocol, TypeVar, runtime_checkable
 
 import pika
 from pika import connection
-from pika.channel import Channel
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.exceptions import AMQPError
 
 from moneymanager import notifications_service_config
 
@@ -25,16 +30,10 @@ class ExchangeConfig:
 class PublisherMessage:
     routing_key: str
     body: str | bytes
+    content_type: str | None = None
 
 
 class Publisher(Protocol):
-    def __init__(
-        self,
-        connection_params: connection.Parameters,
-        exchange: ExchangeConfig,
-    ) -> None:
-        ...
-
     def add_message(self, message: PublisherMessage) -> None:
         ...
 
@@ -42,107 +41,257 @@ class Publisher(Protocol):
         ...
 
 
-class AsynchronousPublisher:
-    _connection_class: type[pika.BaseConnection] = pika.SelectConnection
+@runtime_checkable
+class StagingPublisher(Publisher, Protocol):
+    """Publisher storing messages in the current database transaction."""
+
+    def stage(self, messages: list[PublisherMessage]) -> list[int]:
+        ...
+
+    def replace(self, ids: list[int], messages: list[PublisherMessage]) -> list[int]:
+        ...
+
+
+class PublisherConnection:
+    """Blocking connection shared by publishers of one process.
+
+    Blocking connection answers heartbeats only while processing data events,
+    so a daemon thread does it between publishes to keep idle connection open.
+    """
+
+    # Half of the heartbeat timeout proposed by RabbitMQ by default.
+    DEFAULT_HEARTBEAT_INTERVAL = 30
 
     @notifications_service_config.inject("connection_params")
+    def __init__(self, connection_params: connection.Parameters) -> None:
+        self._connection_params = connection_params
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._connection: pika.BlockingConnection | None = None
+        self._channel: BlockingChannel | None = None
+        self._declared_exchanges: set[str] = set()
+        self._heartbeat_pid: int | None = None
+
+    def publish(
+        self,
+        exchange: ExchangeConfig,
+        messages: deque[PublisherMessage],
+    ) -> None:
+        """Publish and pop messages from the queue, reconnecting once on failure."""
+        with self._lock:
+            try:
+                self._publish_messages(exchange, messages)
+            except AMQPError:
+                logger.warning("RabbitMQ connection lost, reconnecting")
+                self._close_connection()
+                self._publish_messages(exchange, messages)
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_connection()
+
+    def _publish_messages(
+        self,
+        exchange: ExchangeConfig,
+        messages: deque[PublisherMessage],
+    ) -> None:
+        channel = self._get_channel()
+        if exchange.name not in self._declared_exchanges:
+            logger.info("Declaring exchange: %s", exchange.name)
+            channel.exchange_declare(
+                exchange=exchange.name,
+                exchange_type=exchange.exchange_type,
+                durable=exchange.durable,
+            )
+            self._declared_exchanges.add(exchange.name)
+        while messages:
+            message = messages[0]
+            channel.basic_publish(
+                exchange.name,
+                message.routing_key,
+                message.body,
+                pika.BasicProperties(
+                    app_id="moneyger-server",
+                    content_type=message.content_type,
+                ),
+            )
+            messages.popleft()
+
+    def _get_channel(self) -> BlockingChannel:
+        if self._pid != os.getpid():
+            self._reset()
+        self._process_data_events()
+        if self._connection is None or self._connection.is_closed:
+            logger.info("Opening RabbitMQ connection")
+            self._reset()
+            self._connection = pika.BlockingConnection(self._connection_params)
+            self._start_heartbeats()
+        if self._channel is None or self._channel.is_closed:
+            self._channel = self._connection.channel()
+            self._declared_exchanges.clear()
+        return self._channel
+
+    def _process_data_events(self) -> None:
+        """Answer heartbeats, closing the connection if broker has dropped it."""
+        if self._pid != os.getpid() or self._connection is None:
+            return
+        try:
+            if self._connection.is_open:
+                self._connection.process_data_events(time_limit=0)
+        except AMQPError:
+            logger.info("RabbitMQ connection was closed by broker")
+            self._close_connection()
+
+    def _start_heartbeats(self) -> None:
+        interval = self._heartbeat_interval()
+        if interval is None or self._heartbeat_pid == os.getpid():
+            return
+        self._heartbeat_pid = os.getpid()
+        threading.Thread(
+            target=self._send_heartbeats,
+            args=(interval,),
+            name="rabbitmq-heartbeats",
+            daemon=True,
+        ).start()
+
+    def _send_heartbeats(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                self._process_data_events()
+
+    def _heartbeat_interval(self) -> float | None:
+        heartbeat = self._connection_params.heartbeat
+        if heartbeat == 0:
+            return None
+        if isinstance(heartbeat, int):
+            return heartbeat / 2
+        return self.DEFAULT_HEARTBEAT_INTERVAL
+
+    def _close_connection(self) -> None:
+        if self._pid == os.getpid() and self._connection is not None:
+            try:
+                if self._connection.is_open:
+                    self._connection.close()
+            except AMQPError:
+                logger.exception("Failed to close RabbitMQ connection")
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._connection = None
+        self._channel = None
+        self._declared_exchanges.clear()
+
+
+class PersistentPublisher:
+    """Publishes messages over the shared connection.
+
+    Messages that failed to be published are retried with the next ones,
+    the oldest are dropped once the queue is full.
+    """
+
+    @notifications_service_config.inject("publisher_connection")
     def __init__(
         self,
-        connection_params: connection.Parameters,
+        publisher_connection: PublisherConnection,
         exchange: ExchangeConfig,
+        max_queue_size: int = 1000,
     ) -> None:
-        self._connection_params = connection_params
+        self._connection = publisher_connection
         self._exchange = exchange
         self._message_queue: deque[PublisherMessage] = deque()
-        self._connection: pika.BaseConnection | None = None
-        self._channel: Channel | None = None
+        self._max_queue_size = max_queue_size
 
     def add_message(self, message: PublisherMessage) -> None:
+        if len(self._message_queue) >= self._max_queue_size:
+            dropped = self._message_queue.popleft()
+            logger.error("Publisher queue is full, dropping %s", dropped.routing_key)
         self._message_queue.append(message)
 
     def publish(self) -> None:
-        try:
-            self._create_connection()
-            self._connection.ioloop.start()
-        except Exception:
-            logger.exception("RabbitMQ connection failed")
-            self._close_connection()
-            if self._connection and not self._connection.is_closed:
-                self._connection.ioloop.start()
-
-    def _create_connection(self) -> pika.BaseConnection:
-        self._connection = self._connection_class(
-            self._connection_params,
-            on_open_callback=self._on_connection_open,
-            on_open_error_callback=self._on_connection_open_error,
-            on_close_callback=self._on_connection_closed,
-        )
-        return self._connection
+        self._connection.publish(self._exchange, self._message_queue)
 
-    def _close_connection(self) -> None:
-        logger.info("Stopping")
-        if self._channel is not None:
-            self._channel.close()
-        if self._connection and not self._connection.is_closed:
-            self._connection.close()
 
-    def _on_connection_open(self, connection: pika.BaseConnection) -> None:
-        logger.info("Connection opened")
-        connection.channel(on_open_callback=self._on_channel_open)
+class BackgroundPublisher:
+    """Hands messages over to a worker thread, so that callers never wait for broker.
 
-    def _on_connection_open_error(
-        self,
-        connection: pika.BaseConnection,
-        exc: BaseException,
-    ) -> None:
-        logger.error("Failed to open RabbitMQ connection: %s", exc)
-        connection.ioloop.stop()
+    Messages are dropped if the bounded queue is full or publishing fails.
+    """
 
-    def _on_connection_closed(
+    @notifications_service_config.inject("publisher_connection")
+    def __init__(
         self,
-        connection: pika.BaseConnection,
-        exc: BaseException,
+        publisher_connection: PublisherConnection,
+        exchange: ExchangeConfig,
+        max_queue_size: int = 1000,
     ) -> None:
-        logger.info("Connection closed: %s", exc)
-        self._channel = None
-        connection.ioloop.stop()
+        self._connection = publisher_connection
+        self._exchange = exchange
+        self._message_queue: deque[PublisherMessage] = deque()
+        self._outgoing: queue.Queue[PublisherMessage] = queue.Queue(max_queue_size)
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+        self._worker: threading.Thread | None = None
 
-    def _on_channel_open(self, channel: Channel) -> None:
-        logger.info("Channel opened")
-        self._channel = channel
-        self._channel.add_on_close_callback(self._on_channel_closed)
-        self._setup_exchange()
+    def add_message(self, message: PublisherMessage) -> None:
+        self._message_queue.append(message)
 
-    def _on_channel_closed(self, channel: Channel, reason) -> None:
-        logger.info("Channel %i was closed: %s", channel, reason)
-        self._channel = None
+    def publish(self) -> None:
+        self._start_worker()
+        while self._message_queue:
+            message = self._message_queue.popleft()
+            try:
+                self._outgoing.put_nowait(message)
+            except queue.Full:
+                logger.error(
+                    "Publisher queue is full, dropping %s", message.routing_key
+                )
 
-    def _setup_exchange(self) -> None:
-        logger.info("Declaring exchange: %s", self._exchange.name)
-        self._channel.exchange_declare(
-            exchange=self._exchange.name,
-            exchange_type=self._exchange.exchange_type,
-            durable=self._exchange.durable,
-            callback=self._on_exchange_declared,
-        )
+    def join(self) -> None:
+        """Wait until all handed over messages are processed."""
+        self._outgoing.join()
 
-    def _on_exchange_declared(self, _frame) -> None:
-        logger.info("Exchange declared: %s", self._exchange.name)
-        self._publish_messages()
+    def _start_worker(self) -> None:
+        if self._is_worker_running():
+            return
+        with self._lock:
+            if self._is_worker_running():
+                return
+            if self._pid != os.getpid():
+                self._outgoing = queue.Queue(self._outgoing.maxsize)
+                self._pid = os.getpid()
+            self._worker = threading.Thread(
+                target=self._run,
+                args=(self._outgoing,),
+                name=f"publisher-{self._exchange.name}",
+                daemon=True,
+            )
+            self._worker.start()
 
-    def _publish_messages(self) -> None:
-        if self._channel is None or not self._channel.is_open:
-            return self._close_connection()
-        message_properties = pika.BasicProperties(
-            app_id="moneyger-server",
+    def _is_worker_running(self) -> bool:
+        return (
+            self._pid == os.getpid()
+            and self._worker is not None
+            and self._worker.is_alive()
         )
-        while self._message_queue:
-            message = self._message_queue.popleft()
-            self._channel.basic_publish(
-                self._exchange.name,
-                message.routing_key,
-                message.body,
-                message_properties,
-            )
-        logger.info("Messages published")
-        self._close_connection()
+
+    def _run(self, outgoing: queue.Queue[PublisherMessage]) -> None:
+        messages: deque[PublisherMessage] = deque()
+        while True:
+            messages.append(outgoing.get())
+            taken = 1
+            while True:
+                try:
+                    messages.append(outgoing.get_nowait())
+                except queue.Empty:
+                    break
+                taken += 1
+            try:
+                self._connection.publish(self._exchange, messages)
+            except Exception:
+                logger.exception("Failed to publish %d messages", len(messages))
+                messages.clear()
+            finally:
+                for _ in range(taken):
+                    outgoing.task_done()
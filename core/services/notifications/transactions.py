@@ -1,17 +1,19 @@
-import json
 import threading
 from collections import defaultdict
 from decimal import Decimal
-from operator import itemgetter
 from typing import TYPE_CHECKING, Collection, Iterable, Literal, Self, TypedDict
 
+from django.db import transaction
+
 from core.constants import CurrencyCode, TransactionType
 from core.services.notifications.publishers import Publisher
 from moneymanager import services_container
 
+from ..buffers import active_batches, register_batch
 from ..currency import CurrencyConverter
+from .encoders import JsonEncoder, TransactionsEncoder
 from .producer import Producer
-from .publishers import PublisherMessage
+from .publishers import PublisherMessage, StagingPublisher
 
 if TYPE_CHECKING:
     from core.transactions.models import Transaction
@@ -26,63 +28,228 @@ class _SerializedTransaction(TypedDict):
 
 
 @services_container.inject("currency_converter")
-def _serialize_transaction(
-    transaction: "Transaction",
+def _serialize_transactions(
+    transactions: Iterable["Transaction"],
     currency_converter: CurrencyConverter,
-) -> _SerializedTransaction:
-    usd_amount = currency_converter.convert(
-        transaction.amount_decimal,
-        transaction.currency,
-        CurrencyCode.USD,
-    )
-    return _SerializedTransaction(
-        transaction_id=transaction.id,
-        account_id=transaction.account.id,
-        transaction_type=transaction.category.transaction_type,
-        amount=_serialize_amount(usd_amount, transaction.category.transaction_type),
-        transaction_time=transaction.transaction_time.isoformat(),
-    )
+) -> list[_SerializedTransaction]:
+    transactions = list(transactions)
+    transaction_types = _get_transaction_types(transactions)
+    amounts_by_currency: dict[CurrencyCode, list[Decimal]] = defaultdict(list)
+    for transaction in transactions:
+        amounts_by_currency[transaction.currency].append(transaction.amount_decimal)
+    usd_amounts_by_currency = {
+        currency: iter(
+            currency_converter.convert_many(amounts, currency, CurrencyCode.USD)
+        )
+        for currency, amounts in amounts_by_currency.items()
+    }
+    serialized_transactions = []
+    for transaction in transactions:
+        transaction_type = transaction_types[transaction.category_id]
+        usd_amount = next(usd_amounts_by_currency[transaction.currency])
+        serialized_transactions.append(
+            _SerializedTransaction(
+                transaction_id=transaction.id,
+                account_id=transaction.account_id,
+                transaction_type=transaction_type,
+                amount=_serialize_amount(usd_amount, transaction_type),
+                transaction_time=transaction.transaction_time.isoformat(),
+            )
+        )
+    return serialized_transactions
+
+
+def _get_transaction_types(
+    transactions: Iterable["Transaction"],
+) -> dict[int, TransactionType]:
+    from core.transactions.models import Transaction, TransactionCategory
+
+    transaction_types = {}
+    for transaction in transactions:
+        if Transaction.category.is_cached(transaction):
+            transaction_types[
+                transaction.category_id
+            ] = transaction.category.transaction_type
+    missing_category_ids = {
+        transaction.category_id for transaction in transactions
+    } - transaction_types.keys()
+    if missing_category_ids:
+        transaction_types.update(
+            TransactionCategory.objects.filter(id__in=missing_category_ids).values_list(
+                "id", "transaction_type"
+            )
+        )
+    return transaction_types
 
 
 def _serialize_amount(amount: Decimal | int, transaction_type: TransactionType) -> str:
-    if transaction_type is TransactionType.OUTCOME:
+    if transaction_type == TransactionType.OUTCOME:
         return str(-amount)
     return str(amount)
 
 
+CREATED_ROUTING_KEY = "transaction.event.created"
+UPDATED_ROUTING_KEY = "transaction.event.updated"
+DELETED_ROUTING_KEY = "transaction.event.deleted"
+
+
+class _TransactionEvents:
+    """Events coalesced by transaction id.
+
+    Events recorded by one call within a database transaction form a batch,
+    that is dropped if its savepoint is rolled back.
+    """
+
+    def __init__(self, producer: "TransactionsProducer") -> None:
+        self._producer = producer
+        self.events: dict[int, tuple[str, _SerializedTransaction | int]] = {}
+        self.staged_ids: list[int] = []
+        self.done = False
+
+    def __call__(self) -> None:
+        self._producer.flush(self)
+
+    def add(self, routing_key: str, transaction_id: int, body) -> None:
+        previous_routing_key, _ = self.events.get(transaction_id, (None, None))
+        if previous_routing_key == CREATED_ROUTING_KEY:
+            if routing_key == DELETED_ROUTING_KEY:
+                del self.events[transaction_id]
+                return
+            routing_key = CREATED_ROUTING_KEY
+        self.events[transaction_id] = (routing_key, body)
+
+    def merge(self, other: "_TransactionEvents") -> None:
+        for transaction_id, (routing_key, body) in other.events.items():
+            self.add(routing_key, transaction_id, body)
+
+    def get_messages(self) -> dict[str, list]:
+        messages = defaultdict(list)
+        for routing_key, body in self.events.values():
+            messages[routing_key].append(body)
+        return messages
+
+    def pop_messages(self) -> dict[str, list]:
+        messages = self.get_messages()
+        self.events.clear()
+        return messages
+
+
 class TransactionsProducer(Producer):
-    def __init__(self, publisher: Publisher) -> None:
+    """Buffers events per database transaction until they are sent.
+
+    Staging publishers, such as OutboxPublisher, store events as soon as they
+    are recorded, so they are committed atomically with the changes. Stored
+    rows are only appended, send() coalesces them once. Other publishers
+    can't take part in the transaction, events left unsent are published
+    once it commits and may be lost if the process dies before that.
+    Events of rolled back transactions and savepoints are dropped.
+    """
+
+    def __init__(
+        self,
+        publisher: Publisher,
+        encoder: TransactionsEncoder | None = None,
+    ) -> None:
         super().__init__(publisher)
-        self.buffer_queues: dict[str, list] = defaultdict(list)
+        self.encoder = encoder or JsonEncoder()
+        self._buffer_name = f"transaction_events_{id(self)}"
         self._lock = threading.Lock()
 
     def delete_transactions(self, transactions: Collection[int]) -> Self:
-        with self._lock:
-            self.buffer_queues["transaction.event.deleted"].extend(transactions)
-        return self
+        events = _TransactionEvents(self)
+        for transaction_id in transactions:
+            events.add(DELETED_ROUTING_KEY, transaction_id, transaction_id)
+        return self._record(events)
 
     def add_transactions(self, transactions: Iterable["Transaction"]) -> Self:
-        return self._add_transactions("transaction.event.created", transactions)
+        return self._add_transactions(CREATED_ROUTING_KEY, transactions)
 
     def update_transactions(self, transactions: Iterable["Transaction"]) -> Self:
-        return self._add_transactions("transaction.event.updated", transactions)
+        return self._add_transactions(UPDATED_ROUTING_KEY, transactions)
 
     def _add_transactions(
         self,
         routing_key: str,
         transactions: Iterable["Transaction"],
     ) -> Self:
-        serialized_transactions = list(map(_serialize_transaction, transactions))
-        with self._lock:
-            self.buffer_queues[routing_key].extend(serialized_transactions)
-        return self
+        events = _TransactionEvents(self)
+        for serialized in _serialize_transactions(transactions):
+            events.add(routing_key, serialized["transaction_id"], serialized)
+        return self._record(events)
 
     def send(self) -> None:
+        """Publish events of the current transaction."""
+        batches = self._pop_batches()
+        if not batches:
+            return
+        if not isinstance(self.publisher, StagingPublisher):
+            events = _TransactionEvents(self)
+            for batch in batches:
+                events.merge(batch)
+            self.send_events(events)
+        elif len(batches) > 1:
+            events = _TransactionEvents(self)
+            for batch in batches:
+                events.merge(batch)
+            self.publisher.replace(
+                [row_id for batch in batches for row_id in batch.staged_ids],
+                self._encode(events.pop_messages()),
+            )
+
+    def clear(self) -> None:
+        """Drop unsent events of the current transaction."""
+        batches = self._pop_batches()
+        if batches and isinstance(self.publisher, StagingPublisher):
+            self.publisher.replace(
+                [row_id for batch in batches for row_id in batch.staged_ids], []
+            )
+
+    def flush(self, events: _TransactionEvents) -> None:
+        # Staged events are committed already.
+        if not events.done and not isinstance(self.publisher, StagingPublisher):
+            events.done = True
+            self.send_events(events)
+
+    def send_events(self, events: _TransactionEvents) -> None:
+        messages = events.pop_messages()
+        if not messages:
+            return
+        # Publisher queue is shared between threads, messages of one
+        # transaction must be published together.
         with self._lock:
-            non_empty_queues = filter(itemgetter(1), self.buffer_queues.items())
-            for routing_key, transactions in non_empty_queues:
-                self.publisher.add_message(
-                    PublisherMessage(routing_key, json.dumps(transactions)),
-                )
-            self.buffer_queues.clear()
-        super().send()
+            for message in self._encode(messages):
+                self.publisher.add_message(message)
+            super().send()
+
+    def _pop_batches(self) -> list[_TransactionEvents]:
+        if not transaction.get_connection().in_atomic_block:
+            return []
+        batches = [
+            batch for batch in active_batches(self._buffer_name) if not batch.done
+        ]
+        for batch in batches:
+            batch.done = True
+        return batches
+
+    def _encode(self, messages: dict[str, list]) -> list[PublisherMessage]:
+        encoded = []
+        for routing_key, events in messages.items():
+            if routing_key == DELETED_ROUTING_KEY:
+                body = self.encoder.encode_ids(events)
+            else:
+                body = self.encoder.encode(events)
+            encoded.append(
+                PublisherMessage(routing_key, body, self.encoder.content_type)
+            )
+        return encoded
+
+    def _record(self, events: _TransactionEvents) -> Self:
+        if not transaction.get_connection().in_atomic_block:
+            self.send_events(events)
+            return self
+        if isinstance(self.publisher, StagingPublisher):
+            events.staged_ids = self.publisher.stage(
+                self._encode(events.get_messages())
+            )
+        register_batch(self._buffer_name, events)
+        return self
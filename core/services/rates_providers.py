@@ -14,6 +14,12 @@ from ..constants import CurrencyCode
 T = TypeVar("T")
 
 
+def seconds_to_midnight() -> int:
+    now = datetime.utcnow()
+    midnight = datetime.combine(now + timedelta(days=1), time())
+    return int((midnight - now).total_seconds())
+
+
 class FetchRatesException(BaseException):
     def __init__(self, url: str | None = None) -> None:
         if url:
@@ -36,7 +42,7 @@ class BaseRates(Generic[T], metaclass=ABCMeta):
         return cache.get_or_set(
             f"{self.__class__.__name__}_data",
             self.fetch_data,
-            self._seconds_to_midnight(),
+            seconds_to_midnight(),
         )
 
     @abstractmethod
@@ -47,11 +53,6 @@ class BaseRates(Generic[T], metaclass=ABCMeta):
     def get_rate(self, cur_from: CurrencyCode, cur_to: CurrencyCode) -> Decimal:
         pass
 
-    def _seconds_to_midnight(self) -> int:
-        now = datetime.utcnow()
-        midnight = datetime.combine(now + timedelta(days=1), time())
-        return (midnight - now).seconds
-
 
 class AlfaBankNationalRates(BaseRates[dict[str, Decimal]]):
     def fetch_data(self) -> dict[str, Decimal]:
@@ -1,5 +1,5 @@
 from decimal import Decimal
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from django.test import TestCase
 from iso4217 import Currency
@@ -42,3 +42,35 @@ class CurrencyConverterTestCase(TestCase):
                 self.rates.get_rate.return_value = Decimal(rate)
                 result = self.converter.convert(Decimal(amount), cur_from, cur_to)
                 self.assertEqual(result, Decimal(expected_value))
+
+    def test_rates_memoized(self):
+        """Provider must be called once per currency pair."""
+        for _ in range(5):
+            self.converter.convert(Decimal(10), CurrencyCode.RUB, CurrencyCode.EUR)
+            self.converter.convert(Decimal(10), CurrencyCode.USD, CurrencyCode.EUR)
+        self.assertEqual(self.rates.get_rate.call_count, 2)
+        self.assertEqual(self.converter.misses, 2)
+        self.assertEqual(self.converter.hits, 8)
+
+    @patch("core.services.currency.seconds_to_midnight", return_value=0)
+    def test_rates_expired(self, _):
+        """Rates must be requested again after midnight."""
+        for _ in range(3):
+            self.converter.convert(Decimal(10), CurrencyCode.RUB, CurrencyCode.EUR)
+        self.assertEqual(self.rates.get_rate.call_count, 3)
+
+    def test_provider_changed(self):
+        """Rates must be dropped when provider is replaced."""
+        self.converter.convert(Decimal(10), CurrencyCode.RUB, CurrencyCode.EUR)
+        self.converter.rates_provider = self.rates
+        self.converter.convert(Decimal(10), CurrencyCode.RUB, CurrencyCode.EUR)
+        self.assertEqual(self.rates.get_rate.call_count, 2)
+
+    def test_convert_many(self):
+        """Amounts must be converted with a single rate lookup."""
+        self.rates.get_rate.return_value = Decimal("0.233")
+        result = self.converter.convert_many(
+            (Decimal("25.5"), Decimal(1)), CurrencyCode.USD, CurrencyCode.EUR
+        )
+        self.assertListEqual(result, [Decimal("5.94"), Decimal("0.23")])
+        self.rates.get_rate.assert_called_once_with(CurrencyCode.USD, CurrencyCode.EUR)
@@ -0,0 +1,66 @@
+import json
+
+import msgpack
+from django.test import SimpleTestCase
+
+from ..notifications.encoders import (
+    ENCODERS,
+    ColumnarJsonEncoder,
+    MsgpackEncoder,
+    decode_transactions,
+)
+
+TRANSACTIONS = [
+    {
+        "transaction_id": 1,
+        "account_id": 2,
+        "transaction_type": "IN",
+        "amount": "10.5",
+        "transaction_time": "2024-01-01T00:00:00+00:00",
+    },
+    {
+        "transaction_id": 3,
+        "account_id": 2,
+        "transaction_type": "OUT",
+        "amount": "-7",
+        "transaction_time": "2024-01-02T00:00:00+00:00",
+    },
+]
+
+
+class EncodersTests(SimpleTestCase):
+    def test_round_trip(self):
+        """Every format must be decoded into the original layout."""
+        for encoder_class in ENCODERS.values():
+            encoder = encoder_class()
+            with self.subTest(encoder=encoder.content_type):
+                self.assertListEqual(
+                    decode_transactions(
+                        encoder.encode(TRANSACTIONS), encoder.content_type
+                    ),
+                    TRANSACTIONS,
+                )
+                self.assertListEqual(
+                    decode_transactions(
+                        encoder.encode_ids([1, 3]), encoder.content_type
+                    ),
+                    [1, 3],
+                )
+
+    def test_columnar_smaller(self):
+        """Columnar formats must be smaller than the original one."""
+        size = len(ENCODERS["json"]().encode(TRANSACTIONS))
+        for encoder in (ColumnarJsonEncoder(), MsgpackEncoder()):
+            self.assertLess(len(encoder.encode(TRANSACTIONS)), size)
+
+    def test_unsupported_version(self):
+        """Unknown columnar version must be rejected."""
+        with self.assertRaises(ValueError):
+            decode_transactions(
+                json.dumps({"version": 2, "transaction_id": []}),
+                ColumnarJsonEncoder.content_type,
+            )
+        with self.assertRaises(ValueError):
+            decode_transactions(
+                msgpack.packb({"transaction_id": []}), MsgpackEncoder.content_type
+            )
@@ -1,15 +1,22 @@
+import os
 from collections import deque
+from unittest import skipUnless
 
 from django.conf import settings
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 
 from core.services.messages import MessageCache
 from core.tests import CacheClearMixin
 
 from .factories import MessageFactory
 
+TEST_REDIS_URL = os.environ.get("TEST_REDIS_URL")
+
+
+class MessageCacheTestsMixin:
+    cache_name = "default"
 
-class TestMessageCache(CacheClearMixin, TestCase):
     def test_empty_cache(self):
         message_cache = self._get_cache()
         messages = message_cache.get_all()
@@ -23,12 +30,18 @@ class TestMessageCache(CacheClearMixin, TestCase):
         self.assertEqual(len(messages), 1)
         self.assertIsInstance(messages[0], dict)
 
+    def test_messages_order(self):
+        message_cache = self._get_cache()
+        pushed_messages = [message_cache.push(MessageFactory()) for _ in range(3)]
+        self.assertEqual(list(message_cache.get_all()), pushed_messages)
+
     def test_cache_size_limit(self):
         message_cache = self._get_cache()
         for _ in range(settings.CHAT_CACHE_SIZE_LIMIT + 20):
-            message_cache.push(MessageFactory())
+            last_message = message_cache.push(MessageFactory())
         messages = message_cache.get_all()
         self.assertEqual(len(messages), settings.CHAT_CACHE_SIZE_LIMIT)
+        self.assertEqual(messages[-1], last_message)
 
     def test_clear(self):
         message_cache = self._get_cache()
@@ -38,4 +51,37 @@ class TestMessageCache(CacheClearMixin, TestCase):
         self.assertEqual(len(messages), 0)
 
     def _get_cache(self):
-        return MessageCache("default_group")
+        return MessageCache("default_group", self.cache_name)
+
+
+class TestMessageCache(MessageCacheTestsMixin, CacheClearMixin, TestCase):
+    pass
+
+
+@skipUnless(TEST_REDIS_URL, "TEST_REDIS_URL isn't set")
+@override_settings(
+    CACHES=settings.CACHES
+    | {
+        "messages": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": TEST_REDIS_URL,
+            "KEY_PREFIX": "test",
+        }
+    }
+)
+class TestRedisMessageCache(MessageCacheTestsMixin, TestCase):
+    cache_name = "messages"
+
+    def setUp(self):
+        super().setUp()
+        self._get_cache().clear()
+        self.addCleanup(self._get_cache().clear)
+
+    def test_legacy_deque(self):
+        """Deque stored by older releases mustn't break the list."""
+        caches[self.cache_name].set(
+            "default_group_messages", deque([MessageFactory()]), timeout=None
+        )
+        message_cache = self._get_cache()
+        message = message_cache.push(MessageFactory())
+        self.assertEqual(list(message_cache.get_all()), [message])
@@ -0,0 +1,96 @@
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from pika.exceptions import AMQPError
+
+from core.tests import StopPatchersMixin
+from moneymanager import notifications_service_config
+
+from ..notifications.models import OutboxMessage
+from ..notifications.outbox import Outbox, OutboxPublisher
+from ..notifications.publishers import (
+    ExchangeConfig,
+    PublisherConnection,
+    PublisherMessage,
+)
+
+
+class OutboxTestCase(StopPatchersMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.connection_mock = MagicMock(PublisherConnection)
+        self.outbox = Outbox(self.connection_mock)
+        self.exchange = ExchangeConfig("test_exchange", "topic")
+        self.publisher = OutboxPublisher(self.outbox, self.exchange)
+        self.delay_mock = patch(
+            "core.services.notifications.outbox.drain_outbox.delay"
+        ).start()
+
+    def _publish(self, messages_number=1):
+        for i in range(messages_number):
+            self.publisher.add_message(PublisherMessage(f"key.{i}", "{}"))
+        self.publisher.publish()
+
+    def test_messages_stored(self):
+        """Messages must be stored instead of being sent."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._publish(3)
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+        self.connection_mock.publish.assert_not_called()
+        self.delay_mock.assert_called_once()
+
+    def test_drain_scheduled_on_commit(self):
+        """Draining must be scheduled only after commit."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._publish()
+            self.delay_mock.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_empty_queue(self):
+        """Nothing must be stored if there are no messages."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.publisher.publish()
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(len(callbacks), 0)
+
+    def test_drain(self):
+        """Messages must be published in batches and removed."""
+        self._publish(5)
+        published_count = self.outbox.drain(batch_size=2)
+        self.assertEqual(published_count, 5)
+        self.assertEqual(self.connection_mock.publish.call_count, 3)
+        self.assertFalse(OutboxMessage.objects.exists())
+        exchange, messages = self.connection_mock.publish.call_args_list[0].args
+        self.assertEqual(exchange, self.exchange)
+        self.assertListEqual(
+            list(messages),
+            [PublisherMessage("key.0", b"{}"), PublisherMessage("key.1", b"{}")],
+        )
+
+    def test_drain_content_type(self):
+        """Content type of messages must be preserved."""
+        self.publisher.add_message(PublisherMessage("key", b"\x90", "application/x"))
+        self.publisher.publish()
+        self.outbox.drain()
+        _, messages = self.connection_mock.publish.call_args.args
+        self.assertListEqual(
+            list(messages), [PublisherMessage("key", b"\x90", "application/x")]
+        )
+
+    def test_drain_failed(self):
+        """Messages must be kept if publishing failed."""
+        self._publish(3)
+        self.connection_mock.publish.side_effect = AMQPError()
+        with self.assertRaises(AMQPError):
+            self.outbox.drain()
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+
+    def test_drain_command(self):
+        """Command must drain the outbox."""
+        self._publish(3)
+        notifications_service_config.override(Outbox, self.outbox)
+        self.addCleanup(notifications_service_config.reset_override)
+        call_command("drain_outbox", stdout=StringIO())
+        self.assertFalse(OutboxMessage.objects.exists())
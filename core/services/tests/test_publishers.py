@@ -0,0 +1,200 @@
+import threading
+from collections import deque
+from unittest.mock import patch
+
+import pika
+from django.test import SimpleTestCase
+from pika.exceptions import AMQPConnectionError, StreamLostError
+
+from core.tests import StopPatchersMixin
+
+from ..notifications.publishers import (
+    BackgroundPublisher,
+    ExchangeConfig,
+    PersistentPublisher,
+    PublisherConnection,
+    PublisherMessage,
+)
+
+
+class PersistentPublisherTestCase(StopPatchersMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ConnectionMock = patch("pika.BlockingConnection").start()
+        self.ConnectionMock.return_value.is_closed = False
+        self.channel_mock = self.ConnectionMock.return_value.channel.return_value
+        self.channel_mock.is_closed = False
+        self.connection = PublisherConnection(pika.ConnectionParameters())
+        self.publisher = PersistentPublisher(
+            self.connection, ExchangeConfig("test_exchange", "topic")
+        )
+
+    def _publish(self, messages_number=1):
+        for i in range(messages_number):
+            self.publisher.add_message(PublisherMessage(f"key.{i}", b"{}"))
+        self.publisher.publish()
+
+    def test_connection_reused(self):
+        """Connection must be opened and exchange declared only once."""
+        for _ in range(3):
+            self._publish(2)
+        self.ConnectionMock.assert_called_once()
+        self.channel_mock.exchange_declare.assert_called_once()
+        self.assertEqual(self.channel_mock.basic_publish.call_count, 6)
+
+    def test_shared_connection(self):
+        """Publishers must share the connection, declaring own exchanges."""
+        other_publisher = PersistentPublisher(
+            self.connection, ExchangeConfig("other_exchange", "topic")
+        )
+        self._publish()
+        other_publisher.add_message(PublisherMessage("key", b"{}"))
+        other_publisher.publish()
+        self.ConnectionMock.assert_called_once()
+        self.assertEqual(self.channel_mock.exchange_declare.call_count, 2)
+
+    def test_reconnect(self):
+        """Messages must be published after reconnecting."""
+        self._publish()
+        self.channel_mock.basic_publish.side_effect = [StreamLostError(), None]
+        self._publish()
+        self.assertEqual(self.ConnectionMock.call_count, 2)
+        self.assertEqual(self.channel_mock.basic_publish.call_count, 3)
+
+    def test_reconnect_failed(self):
+        """Error must be raised and messages kept if reconnecting fails."""
+        self._publish()
+        self.channel_mock.basic_publish.side_effect = StreamLostError()
+        self.ConnectionMock.side_effect = [AMQPConnectionError()]
+        with self.assertRaises(AMQPConnectionError):
+            self._publish(2)
+        self.assertEqual(len(self.publisher._message_queue), 2)
+
+    def test_forked_process(self):
+        """Inherited connection must not be used in a child process."""
+        self._publish()
+        with patch("os.getpid", return_value=-1):
+            self._publish()
+        self.assertEqual(self.ConnectionMock.call_count, 2)
+        self.ConnectionMock.return_value.close.assert_not_called()
+
+    def test_messages_order(self):
+        """Messages must be published in the order they were added."""
+        self._publish(3)
+        self.assertListEqual(
+            [call.args[1] for call in self.channel_mock.basic_publish.call_args_list],
+            ["key.0", "key.1", "key.2"],
+        )
+        self.assertEqual(self.publisher._message_queue, deque())
+
+    def test_connection_dropped_by_broker(self):
+        """Connection dropped while idle must be reopened before publishing."""
+        self._publish()
+        self.ConnectionMock.return_value.process_data_events.side_effect = (
+            StreamLostError()
+        )
+        self._publish()
+        self.assertEqual(self.ConnectionMock.call_count, 2)
+        self.assertEqual(self.channel_mock.basic_publish.call_count, 2)
+
+    def test_heartbeats(self):
+        """Idle connection must answer heartbeats from a background thread."""
+        ThreadMock = patch(
+            "core.services.notifications.publishers.threading.Thread"
+        ).start()
+        self._publish()
+        self._publish()
+        ThreadMock.assert_called_once()
+        thread_kwargs = ThreadMock.call_args.kwargs
+        with patch("time.sleep", side_effect=[None, RuntimeError]) as sleep_mock:
+            with self.assertRaises(RuntimeError):
+                thread_kwargs["target"](*thread_kwargs["args"])
+        sleep_mock.assert_called_with(self.connection.DEFAULT_HEARTBEAT_INTERVAL)
+        self.assertEqual(
+            self.ConnectionMock.return_value.process_data_events.call_count, 2
+        )
+
+    def test_queue_size_limit(self):
+        """Oldest messages must be dropped once the queue is full."""
+        publisher = PersistentPublisher(
+            self.connection, ExchangeConfig("test_exchange", "topic"), max_queue_size=2
+        )
+        with self.assertLogs(level="ERROR"):
+            for i in range(3):
+                publisher.add_message(PublisherMessage(f"key.{i}", b"{}"))
+        self.assertListEqual(
+            [message.routing_key for message in publisher._message_queue],
+            ["key.1", "key.2"],
+        )
+
+
+class BackgroundPublisherTestCase(StopPatchersMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ConnectionMock = patch("pika.BlockingConnection").start()
+        self.ConnectionMock.return_value.is_closed = False
+        self.channel_mock = self.ConnectionMock.return_value.channel.return_value
+        self.channel_mock.is_closed = False
+        self.publisher = BackgroundPublisher(
+            PublisherConnection(pika.ConnectionParameters()),
+            ExchangeConfig("test_exchange", "topic"),
+            max_queue_size=2,
+        )
+
+    def _publish(self, *routing_keys):
+        for routing_key in routing_keys:
+            self.publisher.add_message(PublisherMessage(routing_key, b"{}"))
+        self.publisher.publish()
+
+    def _published_keys(self):
+        return [call.args[1] for call in self.channel_mock.basic_publish.call_args_list]
+
+    def _block_broker(self):
+        publishing = threading.Event()
+        released = threading.Event()
+
+        def wait_for_release(*args):
+            publishing.set()
+            released.wait(5)
+
+        self.channel_mock.basic_publish.side_effect = wait_for_release
+        self.addCleanup(released.set)
+        return publishing, released
+
+    def test_publish(self):
+        """Messages must be published in order by worker thread."""
+        self._publish("key.0", "key.1")
+        self.publisher.join()
+        self.assertListEqual(self._published_keys(), ["key.0", "key.1"])
+
+    def test_not_blocking(self):
+        """Publishing mustn't wait for broker."""
+        publishing, released = self._block_broker()
+        self._publish("key.0")
+        self.assertTrue(publishing.wait(5))
+        self._publish("key.1")
+        released.set()
+        self.publisher.join()
+        self.assertListEqual(self._published_keys(), ["key.0", "key.1"])
+
+    def test_queue_full(self):
+        """Messages that don't fit into queue must be dropped."""
+        publishing, released = self._block_broker()
+        self._publish("key.0")
+        self.assertTrue(publishing.wait(5))
+        with self.assertLogs(level="ERROR"):
+            self._publish("key.1", "key.2", "key.3")
+        released.set()
+        self.publisher.join()
+        self.assertListEqual(self._published_keys(), ["key.0", "key.1", "key.2"])
+
+    def test_publish_failed(self):
+        """Worker must keep publishing after a failure."""
+        self.channel_mock.basic_publish.side_effect = StreamLostError()
+        with self.assertLogs(level="ERROR"):
+            self._publish("key.0")
+            self.publisher.join()
+        self.channel_mock.basic_publish.side_effect = None
+        self._publish("key.1")
+        self.publisher.join()
+        self.assertEqual(self._published_keys()[-1], "key.1")
@@ -1,8 +1,10 @@
+import tempfile
 from decimal import Decimal
 from unittest.mock import MagicMock, patch
 
+from django.conf import settings
 from django.core.cache import cache
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
 
 from moneymanager import services_container
 
@@ -34,6 +36,9 @@ class MockCurrencyConvertorMixin(ContainerResetOverrideMixin):
         self.converter_mock.convert.side_effect = (
             lambda amount, *_: amount * self.CONVERSION_RATE
         )
+        self.converter_mock.convert_many.side_effect = lambda amounts, *_: [
+            amount * self.CONVERSION_RATE for amount in amounts
+        ]
         services_container.override(CurrencyConverter, self.converter_mock)
 
 
@@ -42,10 +47,8 @@ class MockPublishersMixin(ContainerResetOverrideMixin):
         super().setUp()
         self.publisher_mock = MagicMock(Publisher)
         self.users_rpc_mock = MagicMock(UsersRpcService)
-        services_container.override(
-            TransactionsProducer,
-            TransactionsProducer(self.publisher_mock),
-        )
+        self.transactions_producer = TransactionsProducer(self.publisher_mock)
+        services_container.override(TransactionsProducer, self.transactions_producer)
         services_container.override(UsersProducer, UsersProducer(self.publisher_mock))
         services_container.override(
             MessagesProducer,
@@ -61,3 +64,22 @@ class StopPatchersMixin(SimpleTestCase):
     def setUp(self):
         super().setUp()
         self.addCleanup(patch.stopall)
+
+
+class TemporaryStoragesMixin(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        storages_settings = override_settings(
+            STORAGES=settings.STORAGES
+            | {
+                alias: {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    "OPTIONS": {"location": f"{root.name}/{alias}"},
+                }
+                for alias in ("exports", "imports")
+            }
+        )
+        storages_settings.enable()
+        self.addCleanup(storages_settings.disable)
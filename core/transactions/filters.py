@@ -1,7 +1,28 @@
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+
 from django_filters import rest_framework as filters
 
 from ..constants import TransactionType
-from .models import Transaction, TransactionCategory
+from .models import Transaction, TransactionCategory, TransactionRollup
+
+
+def full_days_range(
+    time_range: slice | None,
+) -> tuple[datetime | None, datetime | None]:
+    """Return bounds of UTC days which are fully covered by inclusive time range."""
+    if time_range is None:
+        return None, None
+    start, end = time_range.start, time_range.stop
+    if start is not None:
+        start = start.astimezone(dt_timezone.utc)
+        midnight = datetime.combine(start.date(), time(), dt_timezone.utc)
+        start = midnight if start == midnight else midnight + timedelta(days=1)
+    if end is not None:
+        end = datetime.combine(
+            end.astimezone(dt_timezone.utc).date(), time(), dt_timezone.utc
+        )
+    return start, end
 
 
 def get_user_categories(request):
@@ -22,6 +43,26 @@ class TransactionFilter(filters.FilterSet):
         fields = ("currency",)
 
 
+class TransactionRollupFilter(filters.FilterSet):
+    category = filters.ModelChoiceFilter(queryset=get_user_categories)
+    transaction_type = filters.ChoiceFilter(
+        "category__transaction_type", choices=TransactionType.choices
+    )
+    transaction_time = filters.DateTimeFromToRangeFilter(method="filter_full_days")
+
+    class Meta:
+        model = TransactionRollup
+        fields = ("currency",)
+
+    def filter_full_days(self, queryset, name, value):
+        start, end = full_days_range(value)
+        if start is not None:
+            queryset = queryset.filter(day__gte=start.date())
+        if end is not None:
+            queryset = queryset.filter(day__lt=end.date())
+        return queryset
+
+
 class TransactionCategoryFilter(filters.FilterSet):
     parent_category = filters.ModelChoiceFilter(queryset=get_user_categories)
     not_subcategory = filters.BooleanFilter(
@@ -0,0 +1,319 @@
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Iterable
+from contextvars import ContextVar
+from datetime import datetime
+from itertools import groupby
+from operator import attrgetter
+
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Max
+from django.utils import timezone
+from simple_history.models import HistoricalRecords
+from simple_history.utils import (
+    bulk_create_with_history as bulk_create_with_full_history,
+)
+
+from ..constants import HistoryMode
+from ..services.buffers import transaction_buffer
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TYPE_CHOICES = (("+", "Created"), ("~", "Changed"), ("-", "Deleted"))
+
+_bulk_deleting: ContextVar[bool] = ContextVar("bulk_deleting", default=False)
+
+
+def is_bulk_deleting() -> bool:
+    """Whether objects are deleted by bulk_delete_with_history.
+
+    Delete receivers must skip side effects, since its callers handle them.
+    """
+    return _bulk_deleting.get()
+
+
+class HistoricalChange(models.Model):
+    """Fields changed by a single insert, update or delete of a tracked model."""
+
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    account = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    history_type = models.CharField(max_length=1, choices=HISTORY_TYPE_CHOICES)
+    history_date = models.DateTimeField(db_index=True)
+    history_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="+",
+    )
+    changes = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=("model", "object_id", "history_date"),
+                name="historical_change_object",
+            )
+        ]
+
+
+class PendingHistory:
+    """Historical rows collected during a transaction and sent on commit."""
+
+    def __init__(self) -> None:
+        self.rows: defaultdict[str, list[dict]] = defaultdict(list)
+
+    def __call__(self) -> None:
+        for model_label, rows in self.rows.items():
+            for start in range(0, len(rows), settings.HISTORY_BATCH_SIZE):
+                batch = rows[start : start + settings.HISTORY_BATCH_SIZE]
+                try:
+                    write_history.delay(
+                        model_label, json.dumps(batch, cls=DjangoJSONEncoder)
+                    )
+                except Exception:
+                    logger.exception("Failed to schedule history writing")
+
+    @classmethod
+    def add(cls, rows: dict[str, list[dict]], using: str | None = None) -> None:
+        """Add rows to the current transaction or send them in autocommit mode."""
+        pending = transaction_buffer("pending_history", cls, using)
+        if pending is None:
+            pending = cls()
+            pending.rows.update(rows)
+            pending()
+            return
+        for model_label, model_rows in rows.items():
+            pending.rows[model_label].extend(model_rows)
+
+
+class TrackedHistoricalRecords(HistoricalRecords):
+    """Historical records written according to HISTORY_MODE.
+
+    full saves a row copy with every change, diff saves only changed fields
+    to HistoricalChange, async saves row copies from a celery task after
+    the transaction is committed.
+    """
+
+    def finalize(self, sender, **kwargs):
+        super().finalize(sender, **kwargs)
+        if issubclass(sender, self.cls) and not sender._meta.abstract:
+            sender._meta.history_records = self
+
+    def post_delete(self, instance, using=None, **kwargs):
+        if not is_bulk_deleting():
+            super().post_delete(instance, using, **kwargs)
+
+    def create_historical_record(self, instance, history_type, using=None):
+        if settings.HISTORY_MODE == HistoryMode.FULL:
+            return super().create_historical_record(instance, history_type, using)
+        self.record_history(
+            [instance],
+            history_type,
+            self.get_history_user(instance),
+            getattr(instance, "_history_date", None) or timezone.now(),
+            using,
+        )
+
+    def record_history(
+        self,
+        instances: Iterable[models.Model],
+        history_type: str,
+        history_user: models.Model | None,
+        history_date: datetime,
+        using: str | None = None,
+    ) -> None:
+        history_user_id = getattr(history_user, "pk", None)
+        if settings.HISTORY_MODE == HistoryMode.DIFF:
+            changes = [
+                HistoricalChange(
+                    model=instance._meta.label_lower,
+                    object_id=instance.pk,
+                    account_id=instance.account_id,
+                    history_type=history_type,
+                    history_date=history_date,
+                    history_user_id=history_user_id,
+                    changes=diff,
+                )
+                for instance in instances
+                if (diff := self.get_changes(instance, history_type)) is not None
+            ]
+            HistoricalChange.objects.using(using).bulk_create(
+                changes, batch_size=settings.HISTORY_BATCH_SIZE
+            )
+            return
+        rows = defaultdict(list)
+        for instance in instances:
+            rows[getattr(instance, self.manager_name).model._meta.label].append(
+                {
+                    **{
+                        field.attname: getattr(instance, field.attname)
+                        for field in self.fields_included(instance)
+                    },
+                    "history_type": history_type,
+                    "history_date": history_date,
+                    "history_user_id": history_user_id,
+                    "history_change_reason": self.get_change_reason_for_object(
+                        instance, history_type, using
+                    ),
+                }
+            )
+        if settings.HISTORY_MODE == HistoryMode.ASYNC:
+            PendingHistory.add(rows, using)
+            return
+        for model_label, model_rows in rows.items():
+            model = apps.get_model(model_label)
+            model.objects.using(using).bulk_create(
+                (model(**row) for row in model_rows),
+                batch_size=settings.HISTORY_BATCH_SIZE,
+            )
+
+    def get_changes(self, instance, history_type: str) -> dict | None:
+        """Return values of changed fields or None if nothing has changed."""
+        if history_type == "-":
+            return {}
+        changes = {
+            field.attname: getattr(instance, field.attname)
+            for field in self.fields_included(instance)
+            if history_type == "+" or instance.is_changed(field.attname)
+        }
+        return changes or None
+
+
+@shared_task
+def write_history(model_label: str, rows: str) -> int:
+    model = apps.get_model(model_label)
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    created = model.objects.bulk_create(
+        model(
+            **{
+                attname: fields[attname].to_python(value)
+                for attname, value in row.items()
+            }
+        )
+        for row in json.loads(rows)
+    )
+    return len(created)
+
+
+def bulk_create_with_history(
+    objs: list[models.Model],
+    model: type[models.Model],
+    batch_size: int | None = None,
+    default_user: models.Model | None = None,
+    default_date: datetime | None = None,
+) -> list[models.Model]:
+    """Bulk create objects and record their history in configured mode."""
+    if settings.HISTORY_MODE == HistoryMode.FULL:
+        return bulk_create_with_full_history(
+            objs,
+            model,
+            batch_size=batch_size,
+            default_user=default_user,
+            default_date=default_date,
+        )
+    with transaction.atomic(savepoint=False):
+        created = model.objects.bulk_create(objs, batch_size=batch_size)
+        model._meta.history_records.record_history(
+            created, "+", default_user, default_date or timezone.now()
+        )
+    return created
+
+
+def bulk_update_with_history(
+    objs: list[models.Model],
+    model: type[models.Model],
+    fields: Iterable[str],
+    batch_size: int | None = None,
+    default_user: models.Model | None = None,
+    default_date: datetime | None = None,
+) -> int:
+    """Bulk update objects and record their history in configured mode."""
+    with transaction.atomic(savepoint=False):
+        updated_count = model.objects.bulk_update(objs, fields, batch_size=batch_size)
+        model._meta.history_records.record_history(
+            objs, "~", default_user, default_date or timezone.now()
+        )
+    return updated_count
+
+
+def bulk_delete_with_history(
+    objs: list[models.Model],
+    model: type[models.Model],
+    default_user: models.Model | None = None,
+    default_date: datetime | None = None,
+) -> int:
+    """Delete objects and record their history in configured mode.
+
+    Delete receivers skip their side effects, so callers must handle them.
+    """
+    with transaction.atomic(savepoint=False):
+        model._meta.history_records.record_history(
+            objs, "-", default_user, default_date or timezone.now()
+        )
+        token = _bulk_deleting.set(True)
+        try:
+            _, deleted = model.objects.filter(pk__in=[obj.pk for obj in objs]).delete()
+        finally:
+            _bulk_deleting.reset(token)
+    return deleted.get(model._meta.label, 0)
+
+
+def compact_history(cutoff: datetime) -> int:
+    """Delete history older than cutoff, keeping the last state of every object.
+
+    Old field changes are merged into the last change before deletion.
+    Objects deleted before cutoff lose their history completely.
+    """
+    _merge_changes(HistoricalChange.objects.filter(history_date__lt=cutoff))
+    deleted_count = 0
+    for model, object_fields, id_field in _history_tables():
+        old_records = model.objects.filter(history_date__lt=cutoff)
+        last_ids = (
+            old_records.values(*object_fields)
+            .annotate(last_id=Max(id_field))
+            .values("last_id")
+        )
+        old_records = old_records.exclude(**{f"{id_field}__in": last_ids})
+        deleted_count += old_records.delete()[0]
+        deleted_count += model.objects.filter(
+            history_date__lt=cutoff, history_type="-"
+        ).delete()[0]
+    return deleted_count
+
+
+def _merge_changes(changes: models.QuerySet) -> None:
+    merged_changes = []
+    for _, object_changes in groupby(
+        changes.order_by("model", "object_id", "id").iterator(),
+        key=attrgetter("model", "object_id"),
+    ):
+        values = {}
+        for change in object_changes:
+            values.update(change.changes)
+        if change.history_type != "-" and change.changes != values:
+            change.changes = values
+            merged_changes.append(change)
+    HistoricalChange.objects.bulk_update(
+        merged_changes, ["changes"], batch_size=settings.HISTORY_BATCH_SIZE
+    )
+
+
+def _history_tables():
+    from .models import Transaction, TransactionCategory
+
+    for tracked_model in (TransactionCategory, Transaction):
+        yield tracked_model.history.model, (
+            tracked_model._meta.pk.attname,
+        ), "history_id"
+    yield HistoricalChange, ("model", "object_id"), "id"
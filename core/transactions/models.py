@@ -1,15 +1,25 @@
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from datetime import timezone as dt_timezone
+from typing import NamedTuple, Self
+
 from colorfield.fields import ColorField
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models.signals import pre_save
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.forms import ValidationError
 from django.utils import timezone
-from simple_history.models import HistoricalRecords
 
 from ..constants import CurrencyCode, TransactionType
 from ..services import currency
+from .history import TrackedHistoricalRecords
 
 
 class BaseModel(models.Model):
@@ -17,11 +27,49 @@ class BaseModel(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
-    history = HistoricalRecords(inherit=True)
+    history = TrackedHistoricalRecords(inherit=True)
 
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        attnames = {field.attname for field in self._meta.concrete_fields}
+        if fields is not None:
+            attnames &= {self._meta.get_field(name).attname for name in fields}
+        self._loaded_values = getattr(self, "_loaded_values", {}) | {
+            attname: self.__dict__[attname]
+            for attname in attnames
+            if attname in self.__dict__
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def loaded_copy(self, *attnames: str) -> Self | None:
+        """Return unsaved instance with provided fields as they were loaded."""
+        loaded_values = getattr(self, "_loaded_values", {})
+        if not all(attname in loaded_values for attname in attnames):
+            return None
+        return type(self)(**{attname: loaded_values[attname] for attname in attnames})
+
+    def is_changed(self, attname: str) -> bool:
+        loaded_values = getattr(self, "_loaded_values", {})
+        if attname not in loaded_values:
+            return True
+        return loaded_values[attname] != getattr(self, attname)
+
 
 class TransactionCategory(BaseModel):
     parent_category = models.ForeignKey(
@@ -40,9 +88,110 @@ class TransactionCategory(BaseModel):
     def __str__(self):
         return f"{self.name} ({self.id})"
 
+    def clean(self):
+        super().clean()
+        self.validate_parent_category()
+
+    def validate_parent_category(self):
+        if (
+            self.pk is not None
+            and self.parent_category_id is not None
+            and self.is_changed("parent_category_id")
+            and TransactionCategoryClosure.objects.filter(
+                ancestor=self.pk, descendant=self.parent_category_id
+            ).exists()
+        ):
+            raise ValidationError("Category can't be moved into its own subtree.")
+
     class Meta:
         verbose_name = "Category"
         verbose_name_plural = "Categories"
+        indexes = (
+            models.Index(
+                fields=("account", "display_order"),
+                condition=models.Q(parent_category__isnull=True),
+                name="category_root_account_order",
+            ),
+        )
+
+
+class TransactionCategoryClosureManager(models.Manager):
+    def insert_categories(self, categories: Iterable[TransactionCategory]) -> None:
+        """Create closure rows for new categories, parents must go first."""
+        new_categories = {category.id: category for category in categories}
+        parent_ids = {
+            category.parent_category_id
+            for category in new_categories.values()
+            if category.parent_category_id not in new_categories
+        }
+        ancestors = defaultdict(list)
+        for ancestor_id, descendant_id, depth in self.filter(
+            descendant__in=parent_ids - {None}
+        ).values_list("ancestor", "descendant", "depth"):
+            ancestors[descendant_id].append((ancestor_id, depth))
+        for category in new_categories.values():
+            ancestors[category.id] = [(category.id, 0)] + [
+                (ancestor_id, depth + 1)
+                for ancestor_id, depth in ancestors[category.parent_category_id]
+            ]
+        self.bulk_create(
+            TransactionCategoryClosure(
+                ancestor_id=ancestor_id,
+                descendant_id=category_id,
+                depth=depth,
+            )
+            for category_id in new_categories
+            for ancestor_id, depth in ancestors[category_id]
+        )
+
+    def move_subtree(self, category: TransactionCategory) -> None:
+        """Relink category subtree to the current parent category."""
+        subtree = dict(
+            self.filter(ancestor=category).values_list("descendant", "depth")
+        )
+        self.filter(descendant__in=subtree.keys()).exclude(
+            ancestor__in=subtree.keys()
+        ).delete()
+        if category.parent_category_id is None:
+            return
+        self.bulk_create(
+            TransactionCategoryClosure(
+                ancestor_id=ancestor_id,
+                descendant_id=descendant_id,
+                depth=ancestor_depth + descendant_depth + 1,
+            )
+            for ancestor_id, ancestor_depth in self.filter(
+                descendant=category.parent_category_id
+            ).values_list("ancestor", "depth")
+            for descendant_id, descendant_depth in subtree.items()
+        )
+
+
+class TransactionCategoryClosure(models.Model):
+    ancestor = models.ForeignKey(
+        TransactionCategory,
+        on_delete=models.CASCADE,
+        related_name="descendant_links",
+    )
+    descendant = models.ForeignKey(
+        TransactionCategory,
+        on_delete=models.CASCADE,
+        related_name="ancestor_links",
+    )
+    depth = models.PositiveIntegerField()
+
+    objects = TransactionCategoryClosureManager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("ancestor", "descendant"),
+                name="unique_category_closure",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
 
 
 class Transaction(BaseModel):
@@ -50,13 +199,13 @@ class Transaction(BaseModel):
         TransactionCategory,
         on_delete=models.CASCADE,
         related_name="transactions",
+        db_index=False,
     )
     amount = models.BigIntegerField(validators=(MinValueValidator(1),))
     currency = models.CharField(max_length=3, choices=CurrencyCode.choices)
     comment = models.CharField(max_length=255, blank=True)
     transaction_time = models.DateTimeField(
         default=timezone.now,
-        db_index=True,
         validators=(MaxValueValidator(timezone.now),),
     )
 
@@ -70,14 +219,211 @@ class Transaction(BaseModel):
 
     def clean(self):
         super().clean()
-        if self.account != self.category.account:
+        self.validate_category_account()
+
+    def validate_category_account(self):
+        if self.account_id != self.category.account_id:
             raise ValidationError("Category must have the same account.")
 
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("account", "transaction_time", "id"),
+                name="transaction_account_time_id",
+            ),
+            models.Index(
+                fields=("category", "transaction_time"),
+                name="transaction_category_time",
+            ),
+        )
+
     def __str__(self):
         return f"{self.category} [{self.id}]"
 
 
+ROLLUP_FIELDS = ("account_id", "category_id", "currency", "amount", "transaction_time")
+
+
+def rollup_day(transaction: Transaction) -> date:
+    return transaction.transaction_time.astimezone(dt_timezone.utc).date()
+
+
+class _RollupKey(NamedTuple):
+    account_id: int
+    category_id: int
+    currency: str
+    day: date
+
+
+def _group_by_rollup_key(
+    transactions: Iterable[Transaction],
+) -> dict[_RollupKey, list[int]]:
+    groups = defaultdict(lambda: [0, 0])
+    for instance in transactions:
+        key = _RollupKey(
+            instance.account_id,
+            instance.category_id,
+            instance.currency,
+            rollup_day(instance),
+        )
+        groups[key][0] += instance.amount
+        groups[key][1] += 1
+    return groups
+
+
+class TransactionRollupManager(models.Manager):
+    def add_transactions(self, transactions: Iterable[Transaction]) -> None:
+        groups = _group_by_rollup_key(transactions)
+        if len(groups) > 1:
+            groups = self._bulk_create_missing(groups)
+        for key, (amount, count) in groups.items():
+            rollups = self.filter(**key._asdict())
+            increment = {
+                "amount": F("amount") + amount,
+                "transaction_count": F("transaction_count") + count,
+            }
+            if rollups.update(**increment):
+                continue
+            try:
+                with transaction.atomic():
+                    self.create(**key._asdict(), amount=amount, transaction_count=count)
+            except IntegrityError:
+                rollups.update(**increment)
+
+    def _bulk_create_missing(
+        self, groups: dict[_RollupKey, list[int]]
+    ) -> dict[_RollupKey, list[int]]:
+        existing_keys = {
+            _RollupKey(*values)
+            for values in self.filter(
+                category__in={key.category_id for key in groups}
+            ).values_list("account_id", "category_id", "currency", "day")
+        }
+        try:
+            with transaction.atomic():
+                self.bulk_create(
+                    TransactionRollup(
+                        **key._asdict(), amount=amount, transaction_count=count
+                    )
+                    for key, (amount, count) in groups.items()
+                    if key not in existing_keys
+                )
+        except IntegrityError:
+            return groups
+        return {key: groups[key] for key in groups.keys() & existing_keys}
+
+    def remove_transactions(self, transactions: Iterable[Transaction]) -> None:
+        for key, (amount, count) in _group_by_rollup_key(transactions).items():
+            rollups = self.filter(**key._asdict())
+            rollups.update(
+                amount=F("amount") - amount,
+                transaction_count=F("transaction_count") - count,
+            )
+            rollups.filter(transaction_count__lte=0).delete()
+
+    @transaction.atomic
+    def rebuild(self, account_ids: Iterable[int] | None = None) -> int:
+        """Recompute rollups from transactions, return number of created rows."""
+        rollups = self.all()
+        transactions = Transaction.objects.all()
+        if account_ids is not None:
+            rollups = rollups.filter(account__in=account_ids)
+            transactions = transactions.filter(account__in=account_ids)
+        rollups.delete()
+        created_rollups = self.bulk_create(
+            (
+                TransactionRollup(**values)
+                for values in transactions.order_by()
+                .values(
+                    "account_id",
+                    "category_id",
+                    "currency",
+                    day=TruncDate("transaction_time", tzinfo=dt_timezone.utc),
+                )
+                .annotate(amount=Sum("amount"), transaction_count=Count("id"))
+                .iterator()
+            ),
+            batch_size=1000,
+        )
+        return len(created_rollups)
+
+
+class TransactionRollup(models.Model):
+    account = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    category = models.ForeignKey(
+        TransactionCategory,
+        on_delete=models.CASCADE,
+        related_name="rollups",
+        db_index=False,
+    )
+    currency = models.CharField(max_length=3, choices=CurrencyCode.choices)
+    day = models.DateField()
+    amount = models.BigIntegerField(default=0)
+    transaction_count = models.IntegerField(default=0)
+
+    objects = TransactionRollupManager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("account", "category", "currency", "day"),
+                name="unique_transaction_rollup",
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("account", "day"),
+                name="rollup_account_day",
+            ),
+            models.Index(
+                fields=("category", "day"),
+                name="rollup_category_day",
+            ),
+        )
+
+    def __str__(self):
+        return f"{self.category_id} {self.day} {self.currency}"
+
+
+_skip_model_validation: ContextVar[bool] = ContextVar(
+    "skip_model_validation", default=False
+)
+
+
+@contextmanager
+def skip_model_validation() -> Iterator[None]:
+    """Only check category account on saves of data validated by serializers."""
+    token = _skip_model_validation.set(True)
+    try:
+        yield
+    finally:
+        _skip_model_validation.reset(token)
+
+
 @receiver(pre_save, sender=Transaction)
 def validate_transaction(sender, instance, raw, **kwargs):
-    if not raw:
+    if raw:
+        return
+    if _skip_model_validation.get():
+        instance.validate_category_account()
+    else:
         instance.full_clean()
+
+
+@receiver(pre_save, sender=TransactionCategory)
+def validate_category(sender, instance, raw, **kwargs):
+    if not raw:
+        instance.validate_parent_category()
+
+
+@receiver(post_save, sender=TransactionCategory)
+def update_category_closure(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        TransactionCategoryClosure.objects.insert_categories((instance,))
+    elif instance.is_changed("parent_category_id"):
+        TransactionCategoryClosure.objects.move_subtree(instance)
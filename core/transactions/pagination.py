@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TransactionCursorPagination(CursorPagination):
+    """Keyset pagination which neither counts rows nor slows down on deep pages."""
+
+    ordering = ("-transaction_time", "-id")
+    page_size_query_param = "limit"
+
+    @classmethod
+    def is_requested(cls, request) -> bool:
+        return cls.cursor_query_param in request.query_params
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(queryset.query.order_by) or self.ordering
@@ -1,10 +1,12 @@
 from decimal import Decimal, InvalidOperation
+from itertools import chain
 
+from django.conf import settings
 from rest_framework import serializers
 
 from ..constants import CurrencyCode
 from ..services.currency import decimal_to_int
-from .models import Transaction, TransactionCategory
+from .models import Transaction, TransactionCategory, skip_model_validation
 
 
 class TransactionCategorySerializer(serializers.ModelSerializer):
@@ -44,6 +46,9 @@ class PositiveDecimalField(serializers.DecimalField):
         return super().to_internal_value(data)
 
 
+ZERO_AMOUNT_ERROR = "Amount must be greater than 0."
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     category = serializers.IntegerField(source="category_id", read_only=True)
     amount = PositiveDecimalField(
@@ -63,14 +68,21 @@ class TransactionSerializer(serializers.ModelSerializer):
             "transaction_time",
         )
 
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if "amount_decimal" in attrs:
+            currency = attrs.get("currency") or self.instance.currency
+            if decimal_to_int(attrs["amount_decimal"], currency) == 0:
+                raise serializers.ValidationError(ZERO_AMOUNT_ERROR)
+        return attrs
+
     def create(self, validated_data):
-        amount = decimal_to_int(
-            validated_data["amount_decimal"],
-            validated_data["currency"],
-        )
-        if amount == 0:
-            raise serializers.ValidationError("Amount must be greater than 0.")
-        return super().create(validated_data)
+        with skip_model_validation():
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with skip_model_validation():
+            return super().update(instance, validated_data)
 
 
 class TransactionUpdateSerializer(TransactionSerializer):
@@ -83,12 +95,114 @@ class TransactionUpdateSerializer(TransactionSerializer):
             raise serializers.ValidationError()
         try:
             category = TransactionCategory.objects.get(pk=value)
-            assert category.account == self.instance.account
+            assert category.account_id == self.instance.account_id
         except (TransactionCategory.DoesNotExist, AssertionError):
             raise serializers.ValidationError("Invalid category id.")
         return value
 
 
+class TransactionBulkCreateSerializer(TransactionSerializer):
+    category = serializers.IntegerField(source="category_id")
+
+
+class TransactionBulkUpdateSerializer(TransactionSerializer):
+    id = serializers.IntegerField()
+    category = serializers.IntegerField(source="category_id", required=False)
+    amount = PositiveDecimalField(
+        source="amount_decimal", max_digits=15, decimal_places=None, required=False
+    )
+
+    class Meta(TransactionSerializer.Meta):
+        extra_kwargs = {"currency": {"required": False}}
+
+    def validate(self, attrs):
+        # Amount depends on currency of the stored transaction,
+        # so it's checked along with other transactions of the batch.
+        return attrs
+
+
+class TransactionBulkSerializer(serializers.Serializer):
+    create = TransactionBulkCreateSerializer(many=True, required=False)
+    update = TransactionBulkUpdateSerializer(many=True, required=False)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    def validate(self, attrs):
+        attrs = {
+            operation: attrs.get(operation, []) for operation in self.fields.keys()
+        }
+        if sum(map(len, attrs.values())) > settings.TRANSACTIONS_BULK_MAX_SIZE:
+            raise serializers.ValidationError(
+                "Ensure there are no more than "
+                f"{settings.TRANSACTIONS_BULK_MAX_SIZE} operations."
+            )
+        transaction_ids = [item["id"] for item in attrs["update"]] + attrs["delete"]
+        if len(set(transaction_ids)) != len(transaction_ids):
+            raise serializers.ValidationError(
+                "Each transaction can be changed only once."
+            )
+        account = self.context["request"].user
+        categories = account.transactioncategory_set.in_bulk(
+            {
+                item["category_id"]
+                for item in chain(attrs["create"], attrs["update"])
+                if "category_id" in item
+            }
+        )
+        transactions = account.transaction_set.select_related("category").in_bulk(
+            transaction_ids
+        )
+        errors = {}
+        create_errors = [
+            self._resolve_category(item, categories) for item in attrs["create"]
+        ]
+        if any(create_errors):
+            errors["create"] = create_errors
+        update_errors = [
+            self._resolve_update(item, categories, transactions)
+            for item in attrs["update"]
+        ]
+        if any(update_errors):
+            errors["update"] = update_errors
+        delete_errors = {
+            index: ["Invalid transaction id."]
+            for index, transaction_id in enumerate(attrs["delete"])
+            if transaction_id not in transactions
+        }
+        if delete_errors:
+            errors["delete"] = delete_errors
+        if errors:
+            raise serializers.ValidationError(errors)
+        attrs["delete"] = [transactions[pk] for pk in attrs["delete"]]
+        return attrs
+
+    def _resolve_category(self, item: dict, categories: dict) -> dict:
+        if "category_id" not in item:
+            return {}
+        category = categories.get(item.pop("category_id"))
+        if category is None:
+            return {"category": ["Invalid category id."]}
+        item["category"] = category
+        return {}
+
+    def _resolve_update(self, item: dict, categories: dict, transactions: dict) -> dict:
+        instance = transactions.get(item.pop("id"))
+        if instance is None:
+            return {"id": ["Invalid transaction id."]}
+        item["instance"] = instance
+        errors = self._resolve_category(item, categories)
+        if "amount_decimal" in item:
+            currency = item.get("currency", instance.currency)
+            if decimal_to_int(item["amount_decimal"], currency) == 0:
+                errors["amount"] = [ZERO_AMOUNT_ERROR]
+        return errors
+
+
+class TransactionBulkResultSerializer(serializers.Serializer):
+    created = TransactionSerializer(many=True)
+    updated = TransactionSerializer(many=True)
+    deleted = serializers.ListField(child=serializers.IntegerField())
+
+
 class SummarySerializer(serializers.Serializer):
     total = serializers.FloatField()
     currency = serializers.ChoiceField(choices=CurrencyCode.choices)
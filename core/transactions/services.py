@@ -1,18 +1,144 @@
-from collections.abc import Iterable
+import hashlib
+import time
+from collections import defaultdict
+from collections.abc import Callable, Collection, Iterable
 from decimal import Decimal
+from functools import partial
+from itertools import chain
+from typing import NamedTuple
+from urllib.parse import urlencode
 
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, QuerySet, Sum, When
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from core.services.notifications.transactions import TransactionsProducer
 from moneymanager import services_container
 
 from ..constants import CurrencyCode, TransactionType
-from ..services.currency import CurrencyConverter
-from ..transactions.filters import TransactionFilter
+from ..services.currency import CurrencyConverter, int_to_decimal
+from ..services.rates_providers import seconds_to_midnight
+from ..transactions.filters import (
+    TransactionFilter,
+    TransactionRollupFilter,
+    full_days_range,
+)
 from ..transactions.serializers import StatsSerializer, SummarySerializer
 from . import utils
-from .models import Transaction
+from .history import (
+    bulk_create_with_history,
+    bulk_delete_with_history,
+    bulk_update_with_history,
+)
+from .models import ROLLUP_FIELDS, Transaction, TransactionRollup
+
+BULK_BATCH_SIZE = 500
+
+_BULK_UPDATE_FIELDS = (
+    "category_id",
+    "amount",
+    "currency",
+    "comment",
+    "transaction_time",
+)
+
+
+class RollupSplit(NamedTuple):
+    rollups: QuerySet[TransactionRollup]
+    transactions: QuerySet[Transaction]
+
+
+def split_by_rollups(
+    request,
+    transactions: QuerySet[Transaction],
+    rollups: QuerySet[TransactionRollup],
+) -> QuerySet[Transaction] | RollupSplit:
+    """
+    Take fully covered days from rollups and only the rest from transactions.
+
+    Rollups hold sums, so only amounts in the default currency are taken from
+    them. Other currencies must be converted and rounded per transaction.
+    Fall back to transactions if query params can't be applied to rollups.
+    """
+    if request.query_params.get(api_settings.SEARCH_PARAM):
+        return transactions
+    filterset = TransactionRollupFilter(request.query_params, rollups, request=request)
+    if not filterset.is_valid():
+        return transactions
+    start, end = full_days_range(filterset.form.cleaned_data.get("transaction_time"))
+    if start is not None and end is not None and start >= end:
+        return transactions
+    currency = request.user.default_currency
+    full_days_lookups = {"currency": currency}
+    if start is not None:
+        full_days_lookups["transaction_time__gte"] = start
+    if end is not None:
+        full_days_lookups["transaction_time__lt"] = end
+    return RollupSplit(
+        filterset.qs.filter(currency=currency),
+        transactions.exclude(**full_days_lookups),
+    )
+
+
+def _account_version_key(account_id: int) -> str:
+    return f"transactions_version_{account_id}"
+
+
+def get_account_version(account_id: int) -> int:
+    # Start from current time, so an evicted counter never repeats old versions.
+    return cache.get_or_set(_account_version_key(account_id), time.time_ns, None)
+
+
+def bump_account_version(account_id: int) -> None:
+    key = _account_version_key(account_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_cached_responses(account_id: int) -> None:
+    """Bump account version now and once more after commit.
+
+    The second bump discards responses computed from pre-commit data.
+    """
+    bump_account_version(account_id)
+    transaction.on_commit(partial(bump_account_version, account_id))
+
+
+def cached_response(
+    request, scope: str, get_response: Callable[[], Response]
+) -> Response:
+    """Reuse response until account data changes or currency rates expire."""
+    account = request.user
+    params = urlencode(
+        sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+        )
+    )
+    key = "_".join(
+        (
+            "response",
+            scope,
+            str(account.id),
+            str(get_account_version(account.id)),
+            account.default_currency,
+            hashlib.md5(params.encode()).hexdigest(),
+        )
+    )
+    data = cache.get(key)
+    if data is not None:
+        return Response(data)
+    response = get_response()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, dict(response.data), seconds_to_midnight())
+    return response
 
 
 def _response_serializer_or_error(serializer):
@@ -21,8 +147,11 @@ def _response_serializer_or_error(serializer):
     return Response(serializer.data)
 
 
-def summary_response(request, transactions):
-    total = compute_total(transactions, request.user.default_currency)
+def summary_response(request, transactions, rollups):
+    total = compute_total(
+        split_by_rollups(request, transactions, rollups),
+        request.user.default_currency,
+    )
     serializer = SummarySerializer(
         data={
             "total": total,
@@ -33,18 +162,24 @@ def summary_response(request, transactions):
 
 
 def stats_response(request, categories):
-    categories_summary = []
-    for category in categories:
-        transactions = TransactionFilter(
-            request.query_params, utils.get_all_transactions(category)
-        ).qs
-        category_total = compute_total(transactions, request.user.default_currency)
-        categories_summary.append(
-            {
-                "id": category.id,
-                "total": category_total,
-            }
-        )
+    categories = list(categories)
+    transactions = TransactionFilter(
+        request.query_params, request.user.transaction_set.all(), request=request
+    ).qs
+    category_totals = compute_category_totals(
+        split_by_rollups(
+            request, transactions, request.user.transactionrollup_set.all()
+        ),
+        [category.id for category in categories],
+        request.user.default_currency,
+    )
+    categories_summary = [
+        {
+            "id": category.id,
+            "total": category_totals.get(category.id, Decimal(0)),
+        }
+        for category in categories
+    ]
     total = sum(map(lambda category: category["total"], categories_summary))
     serializer = StatsSerializer(
         data={
@@ -56,26 +191,198 @@ def stats_response(request, categories):
     return _response_serializer_or_error(serializer)
 
 
-@services_container.inject("currency_converter")
-def compute_total(
-    transaction_set: Iterable[Transaction],
+def _iter_subtotals(
+    transaction_set: Iterable[Transaction] | RollupSplit,
+    output_currency: CurrencyCode,
+) -> Iterable[tuple[CurrencyCode, TransactionType, int, int]]:
+    """Yield currency, transaction type, sum of amounts and their count.
+
+    Amounts in output currency are summed up, others are grouped by value.
+    """
+    if isinstance(transaction_set, RollupSplit):
+        return chain.from_iterable(
+            _iter_subtotals(queryset, output_currency) for queryset in transaction_set
+        )
+    if isinstance(transaction_set, QuerySet):
+        return _subtotals_queryset(transaction_set, output_currency)
+    subtotals = defaultdict(lambda: [0, 0])
+    for transaction in transaction_set:
+        subtotal = subtotals[
+            transaction.currency,
+            transaction.category.transaction_type,
+            None if transaction.currency == output_currency else transaction.amount,
+        ]
+        subtotal[0] += transaction.amount
+        subtotal[1] += 1
+    return (
+        (currency, transaction_type, amount, count)
+        for (currency, transaction_type, _), (amount, count) in subtotals.items()
+    )
+
+
+def _subtotals_queryset(
+    queryset: QuerySet, output_currency: CurrencyCode, *fields: str
+) -> QuerySet:
+    return (
+        queryset.order_by()
+        .annotate(
+            converted_amount=Case(
+                When(currency=output_currency, then=None), default="amount"
+            )
+        )
+        .values(*fields, "currency", "category__transaction_type", "converted_amount")
+        .annotate(subtotal=Sum("amount"), count=Count("pk"))
+        .values_list(
+            *fields, "currency", "category__transaction_type", "subtotal", "count"
+        )
+    )
+
+
+def _sum_subtotals(
+    subtotals: Iterable[tuple[CurrencyCode, TransactionType, int, int]],
     output_currency: CurrencyCode,
     currency_converter: CurrencyConverter,
 ) -> Decimal:
+    # Every converted amount is rounded on its own, as if transactions
+    # were summed one by one, but equal amounts are converted only once.
     total = Decimal(0)
-    for transaction in transaction_set:
-        amount = transaction.amount_decimal
-        if transaction.currency != output_currency:
-            amount = currency_converter.convert(
-                amount, transaction.currency, output_currency
-            )
-        if transaction.category.transaction_type == TransactionType.OUTCOME:
-            total -= amount
+    for currency, transaction_type, amount, count in subtotals:
+        if currency == output_currency:
+            amount_decimal = int_to_decimal(amount, currency)
         else:
-            total += amount
+            amount_decimal = (
+                currency_converter.convert(
+                    int_to_decimal(amount // count, currency),
+                    currency,
+                    output_currency,
+                )
+                * count
+            )
+        if transaction_type == TransactionType.OUTCOME:
+            amount_decimal = -amount_decimal
+        total += amount_decimal
     return total
 
 
+@services_container.inject("currency_converter")
+def compute_total(
+    transaction_set: Iterable[Transaction] | RollupSplit,
+    output_currency: CurrencyCode,
+    currency_converter: CurrencyConverter,
+) -> Decimal:
+    return _sum_subtotals(
+        _iter_subtotals(transaction_set, output_currency),
+        output_currency,
+        currency_converter,
+    )
+
+
+@services_container.inject("currency_converter")
+def compute_category_totals(
+    transaction_set: QuerySet[Transaction] | RollupSplit,
+    category_ids: Collection[int],
+    output_currency: CurrencyCode,
+    currency_converter: CurrencyConverter,
+) -> dict[int, Decimal]:
+    querysets = (
+        transaction_set
+        if isinstance(transaction_set, RollupSplit)
+        else (transaction_set,)
+    )
+    subtotals = defaultdict(list)
+    for category_id, *subtotal in chain.from_iterable(
+        _subtotals_queryset(
+            queryset.filter(category__ancestor_links__ancestor__in=category_ids),
+            output_currency,
+            "category__ancestor_links__ancestor",
+        )
+        for queryset in querysets
+    ):
+        subtotals[category_id].append(subtotal)
+    return {
+        category_id: _sum_subtotals(
+            category_subtotals, output_currency, currency_converter
+        )
+        for category_id, category_subtotals in subtotals.items()
+    }
+
+
 @services_container.inject("transactions_producer")
 def notify_transaction_changes(transactions_producer: TransactionsProducer) -> None:
     transactions_producer.send()
+
+
+class BulkChanges(NamedTuple):
+    created: list[Transaction]
+    updated: list[Transaction]
+    deleted: list[int]
+
+
+def _apply_changes(instance: Transaction, attrs: dict) -> Transaction:
+    # Amount is converted with currency, so currency must be set first.
+    if "currency" in attrs:
+        instance.currency = attrs.pop("currency")
+    for attr, value in attrs.items():
+        setattr(instance, attr, value)
+    return instance
+
+
+@transaction.atomic
+@services_container.inject("transactions_producer")
+def bulk_write_transactions(
+    account,
+    create: list[dict],
+    update: list[dict],
+    delete: list[Transaction],
+    transactions_producer: TransactionsProducer,
+) -> BulkChanges:
+    """Write validated batch of changes bypassing per-object model signals."""
+    history_date = timezone.now()
+    created = []
+    if create:
+        created = bulk_create_with_history(
+            [Transaction(account=account, **attrs) for attrs in create],
+            Transaction,
+            batch_size=BULK_BATCH_SIZE,
+            default_user=account,
+            default_date=history_date,
+        )
+        TransactionRollup.objects.add_transactions(created)
+        transactions_producer.add_transactions(created)
+
+    updated = [_apply_changes(attrs.pop("instance"), attrs) for attrs in update]
+    changed = [
+        instance
+        for instance in updated
+        if any(map(instance.is_changed, _BULK_UPDATE_FIELDS))
+    ]
+    if changed:
+        moved = [
+            instance
+            for instance in changed
+            if any(map(instance.is_changed, ROLLUP_FIELDS))
+        ]
+        TransactionRollup.objects.remove_transactions(
+            instance.loaded_copy(*ROLLUP_FIELDS) for instance in moved
+        )
+        bulk_update_with_history(
+            changed,
+            Transaction,
+            _BULK_UPDATE_FIELDS,
+            batch_size=BULK_BATCH_SIZE,
+            default_user=account,
+            default_date=history_date,
+        )
+        TransactionRollup.objects.add_transactions(moved)
+        transactions_producer.update_transactions(changed)
+
+    if delete:
+        bulk_delete_with_history(
+            delete, Transaction, default_user=account, default_date=history_date
+        )
+        TransactionRollup.objects.remove_transactions(delete)
+        transactions_producer.delete_transactions([instance.id for instance in delete])
+
+    invalidate_cached_responses(account.id)
+    notify_transaction_changes()
+    return BulkChanges(created, updated, [instance.id for instance in delete])
@@ -4,7 +4,9 @@ from django.dispatch import receiver
 from core.services.notifications.transactions import TransactionsProducer
 from moneymanager import services_container
 
-from .models import Transaction
+from .history import is_bulk_deleting
+from .models import ROLLUP_FIELDS, Transaction, TransactionCategory, TransactionRollup
+from .services import invalidate_cached_responses
 
 
 @receiver(post_save, sender=Transaction)
@@ -31,4 +33,48 @@ def transaction_deleted_notification(
     transactions_producer: TransactionsProducer,
     **kwargs,
 ):
+    if is_bulk_deleting():
+        return
     transactions_producer.delete_transactions((instance.id,))
+
+
+@receiver(post_save, sender=Transaction)
+def update_transaction_rollups(
+    sender,
+    instance: Transaction,
+    created: bool,
+    raw: bool,
+    **kwargs,
+):
+    if raw:
+        return
+    if not created:
+        if not any(map(instance.is_changed, ROLLUP_FIELDS)):
+            return
+        previous_instance = instance.loaded_copy(*ROLLUP_FIELDS)
+        if previous_instance is None:
+            TransactionRollup.objects.rebuild((instance.account_id,))
+            return
+        TransactionRollup.objects.remove_transactions((previous_instance,))
+    TransactionRollup.objects.add_transactions((instance,))
+
+
+@receiver(post_delete, sender=Transaction)
+def remove_transaction_rollups(sender, instance: Transaction, **kwargs):
+    if is_bulk_deleting():
+        return
+    if isinstance(kwargs.get("origin"), TransactionCategory):
+        # Category rollups are removed by cascade.
+        return
+    previous_instance = instance.loaded_copy(*ROLLUP_FIELDS)
+    TransactionRollup.objects.remove_transactions((previous_instance or instance,))
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=TransactionCategory)
+@receiver(post_delete, sender=TransactionCategory)
+def invalidate_account_responses(sender, instance, **kwargs):
+    if is_bulk_deleting():
+        return
+    invalidate_cached_responses(instance.account_id)
@@ -74,7 +74,7 @@ class BaseViewTestCase(BaseTestCase):
 
     def __call_view(self, path, request, **kwargs):
         force_authenticate(request, self.account)
-        view = resolve(path).func
+        view = resolve(request.path).func
         view(request, **kwargs)
 
     def _test_get_unauthorized(self, path):
@@ -110,6 +110,10 @@ class BaseSummaryViewTestCase(BaseViewTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()["currency"], self.account.default_currency)
 
+    def _test_cached(self, path, queries_number=0, **kwargs):
+        self.client.get(path)
+        self._test_get_queries_number(queries_number, path, **kwargs)
+
     @contextmanager
     def _test_filter_time(self, path):
         transaction_time = timezone.now() - timedelta(days=10)
@@ -91,10 +91,11 @@ class TransactionCategoryViewTests(BaseViewTestCase):
     def test_add_category_queries_number(self):
         """Correct number of queries must be performed.
 
-        One for adding new category, one for historical record.
+        One for adding new category, one for historical record and one for
+        closure rows.
         """
         self._test_post_queries_number(
-            2,
+            3,
             reverse("transaction-category-list"),
             data={
                 "transaction_type": TransactionType.OUTCOME,
@@ -179,6 +180,7 @@ class TransactionCategoryViewTests(BaseViewTestCase):
         """Deleted transactions must be sent to notifications service."""
         category = self.create_category()
         self.create_transactions_batch(5, category=category)
+        self.transactions_producer.clear()
         response = self.client.delete(
             reverse("transaction-category-detail", args=(category.id,))
         )
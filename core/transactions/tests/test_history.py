@@ -0,0 +1,245 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from core.constants import HistoryMode
+from core.tests import StopPatchersMixin
+
+from ..history import (
+    HistoricalChange,
+    bulk_create_with_history,
+    bulk_delete_with_history,
+    bulk_update_with_history,
+    write_history,
+)
+from ..models import Transaction
+from .base import BaseTestCase
+from .factories import TransactionFactory
+
+
+@override_settings(HISTORY_MODE=HistoryMode.DIFF)
+class DiffHistoryTests(BaseTestCase):
+    def test_create(self):
+        """All fields of created object must be stored."""
+        transaction = self.create_transaction()
+        change = HistoricalChange.objects.get(
+            model="core.transaction", object_id=transaction.id
+        )
+        self.assertEqual(change.history_type, "+")
+        self.assertEqual(change.changes["amount"], transaction.amount)
+        self.assertEqual(change.changes["category_id"], transaction.category_id)
+        self.assertFalse(Transaction.history.exists())
+
+    def test_update(self):
+        """Only changed fields must be stored."""
+        transaction = Transaction.objects.get(pk=self.create_transaction().pk)
+        transaction.comment = "Changed"
+        transaction.save()
+        change = HistoricalChange.objects.get(
+            model="core.transaction", object_id=transaction.id, history_type="~"
+        )
+        self.assertDictEqual(change.changes, {"comment": "Changed"})
+
+    def test_update_refreshed(self):
+        """Changes made elsewhere mustn't be stored after refreshing."""
+        transaction = Transaction.objects.get(pk=self.create_transaction().pk)
+        Transaction.objects.filter(pk=transaction.pk).update(amount=F("amount") + 1)
+        transaction.refresh_from_db()
+        transaction.comment = "Changed"
+        transaction.save()
+        change = HistoricalChange.objects.get(
+            model="core.transaction", object_id=transaction.id, history_type="~"
+        )
+        self.assertDictEqual(change.changes, {"comment": "Changed"})
+
+    def test_unchanged(self):
+        """Nothing must be stored if no fields have changed."""
+        transaction = Transaction.objects.get(pk=self.create_transaction().pk)
+        transaction.save()
+        self.assertFalse(
+            HistoricalChange.objects.filter(
+                object_id=transaction.id, history_type="~"
+            ).exists()
+        )
+
+    def test_delete(self):
+        """Deletion must be stored without fields."""
+        transaction = self.create_transaction()
+        transaction_id = transaction.id
+        transaction.delete()
+        change = HistoricalChange.objects.get(
+            model="core.transaction", object_id=transaction_id, history_type="-"
+        )
+        self.assertDictEqual(change.changes, {})
+
+    def test_bulk_create(self):
+        """History of bulk created objects must be stored."""
+        category = self.create_category()
+        transactions = bulk_create_with_history(
+            TransactionFactory.build_batch(3, account=self.account, category=category),
+            Transaction,
+            default_user=self.account,
+        )
+        self.assertEqual(
+            HistoricalChange.objects.filter(
+                model="core.transaction",
+                object_id__in=[transaction.id for transaction in transactions],
+                history_user=self.account,
+            ).count(),
+            3,
+        )
+
+
+class BulkHistoryTests(BaseTestCase):
+    def test_bulk_update(self):
+        """Updated row copies must be stored."""
+        transactions = list(
+            Transaction.objects.filter(
+                pk__in=[
+                    transaction.pk for transaction in self.create_transactions_batch(2)
+                ]
+            )
+        )
+        for transaction in transactions:
+            transaction.comment = "Changed"
+        bulk_update_with_history(transactions, Transaction, ("comment",))
+        self.assertEqual(
+            Transaction.history.filter(history_type="~", comment="Changed").count(), 2
+        )
+
+    def test_bulk_delete(self):
+        """Deletion must be stored for every object."""
+        transactions = self.create_transactions_batch(2)
+        bulk_delete_with_history(transactions, Transaction, default_user=self.account)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(
+            Transaction.history.filter(
+                history_type="-", history_user=self.account
+            ).count(),
+            2,
+        )
+
+
+@override_settings(HISTORY_MODE=HistoryMode.ASYNC)
+class AsyncHistoryTests(StopPatchersMixin, BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.delay_mock = patch("core.transactions.history.write_history.delay").start()
+
+    def test_written_on_commit(self):
+        """History rows must be written in a batch after commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            category = self.create_category()
+            transaction, *_ = self.create_transactions_batch(3, category=category)
+            transaction_id = transaction.id
+            transaction.delete()
+            self.delay_mock.assert_not_called()
+        self.assertFalse(Transaction.history.exists())
+        self.assertEqual(self.delay_mock.call_count, 2)
+        for call in self.delay_mock.call_args_list:
+            write_history(*call.args)
+        self.assertEqual(Transaction.history.count(), 4)
+        self.assertEqual(Transaction.history.filter(history_type="-").count(), 1)
+        self.assertEqual(
+            Transaction.history.get(id=transaction_id, history_type="+").amount,
+            transaction.amount,
+        )
+
+    @override_settings(HISTORY_BATCH_SIZE=2)
+    def test_batch_size(self):
+        """History rows must be split into batches."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_transactions_batch(5)
+        self.assertEqual(self.delay_mock.call_count, 1 + 3)
+
+    def test_rolled_back(self):
+        """History of rolled back changes mustn't be written."""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with db_transaction.atomic():
+                    self.create_transaction()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.create_category()
+        self.delay_mock.assert_called_once()
+        model_label, _ = self.delay_mock.call_args.args
+        self.assertEqual(model_label, "core.HistoricalTransactionCategory")
+
+
+class CompactHistoryTests(BaseTestCase):
+    def _save_at(self, instance, days_ago):
+        instance._history_date = timezone.now() - timedelta(days=days_ago)
+        instance.save()
+
+    def test_compact(self):
+        """Old history must be deleted except the last object state."""
+        transaction = self.create_transaction()
+        Transaction.history.update(history_date=timezone.now() - timedelta(days=40))
+        for days_ago, comment in ((30, "First"), (20, "Second"), (1, "Third")):
+            transaction.comment = comment
+            self._save_at(transaction, days_ago)
+        call_command("compact_history", days=10, stdout=StringIO())
+        self.assertListEqual(
+            list(
+                Transaction.history.filter(id=transaction.id)
+                .order_by("history_date")
+                .values_list("comment", flat=True)
+            ),
+            ["Second", "Third"],
+        )
+
+    def test_zero_days(self):
+        """Zero retention period mustn't be replaced with the default one."""
+        transaction = self.create_transaction()
+        for days_ago, comment in ((2, "First"), (1, "Second")):
+            transaction.comment = comment
+            self._save_at(transaction, days_ago)
+        call_command("compact_history", days=0, stdout=StringIO())
+        self.assertListEqual(
+            list(
+                Transaction.history.filter(id=transaction.id).values_list(
+                    "comment", flat=True
+                )
+            ),
+            ["Second"],
+        )
+
+    def test_deleted_objects(self):
+        """History of objects deleted before the cutoff must be deleted."""
+        transaction = self.create_transaction()
+        transaction._history_date = timezone.now() - timedelta(days=30)
+        transaction.delete()
+        call_command("compact_history", days=10, stdout=StringIO())
+        self.assertFalse(Transaction.history.filter(id=transaction.id).exists())
+
+    @override_settings(HISTORY_MODE=HistoryMode.DIFF)
+    def test_compact_changes(self):
+        """Old field changes must be merged into the last one."""
+        transaction = self.create_transaction()
+        changes = HistoricalChange.objects.filter(
+            model="core.transaction", object_id=transaction.id
+        )
+        changes.update(history_date=timezone.now() - timedelta(days=40))
+        transaction.comment = "First"
+        self._save_at(transaction, 30)
+        call_command("compact_history", days=10, stdout=StringIO())
+        change = changes.get()
+        self.assertEqual(change.changes["comment"], "First")
+        self.assertEqual(change.changes["amount"], transaction.amount)
+
+
+class HistoryModeSettingTests(SimpleTestCase):
+    @override_settings(HISTORY_MODE="none")
+    def test_invalid(self):
+        """Unknown history mode must be rejected at startup."""
+        with self.assertRaises(ImproperlyConfigured):
+            apps.get_app_config("core").ready()
@@ -1,11 +1,12 @@
 from decimal import Decimal
+from unittest.mock import patch
 
 from django.forms import ValidationError
 
 from accounts.tests.factories import AccountFactory
 from core.constants import CurrencyCode
 
-from ..models import Transaction
+from ..models import Transaction, skip_model_validation
 from .base import BaseTestCase
 
 
@@ -23,3 +24,51 @@ class TransactionTests(BaseTestCase):
                 amount=200,
                 currency=CurrencyCode.EUR,
             )
+
+    def test_full_clean(self):
+        """Model must be fully validated on save by default."""
+        transaction = self.create_transaction()
+        transaction.currency = "invalid"
+        with self.assertRaises(ValidationError):
+            transaction.save()
+
+    def test_skip_model_validation(self):
+        """Category account must be checked even if validation is skipped."""
+        transaction = self.create_transaction()
+        transaction.category = self.create_category(account=AccountFactory())
+        with skip_model_validation(), self.assertRaises(ValidationError):
+            transaction.save()
+
+    def test_skip_model_validation_full_clean(self):
+        """Trusted saves must only check category account."""
+        transaction = self.create_transaction()
+        transaction.comment = "Changed"
+        with patch.object(Transaction, "full_clean") as full_clean_mock:
+            with skip_model_validation():
+                transaction.save()
+            full_clean_mock.assert_not_called()
+            transaction.category = self.create_category(account=AccountFactory())
+            with skip_model_validation(), self.assertRaises(ValidationError):
+                transaction.save()
+            full_clean_mock.assert_not_called()
+            transaction.save()
+            full_clean_mock.assert_called_once()
+
+
+class TransactionCategoryTests(BaseTestCase):
+    def test_move_into_own_subtree(self):
+        """Category mustn't be moved into its own subcategory."""
+        category = self.create_category()
+        subcategory = self.create_category(parent_category=category)
+        category.parent_category = subcategory
+        with self.assertRaises(ValidationError):
+            category.save()
+        category.refresh_from_db()
+        self.assertIsNone(category.parent_category_id)
+
+    def test_move_into_itself(self):
+        """Category mustn't be its own parent."""
+        category = self.create_category()
+        category.parent_category = category
+        with self.assertRaises(ValidationError):
+            category.full_clean()
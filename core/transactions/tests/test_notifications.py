@@ -0,0 +1,263 @@
+import json
+from io import StringIO
+from unittest.mock import MagicMock
+
+from django.core.management import call_command
+from django.db import connection
+from django.db import transaction as db_transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.constants import CurrencyCode
+from core.services.notifications.encoders import (
+    ColumnarJsonEncoder,
+    MsgpackEncoder,
+    decode_transactions,
+)
+from core.services.notifications.models import OutboxMessage
+from core.services.notifications.outbox import Outbox, OutboxPublisher
+from core.services.notifications.publishers import ExchangeConfig, Publisher
+from core.services.notifications.transactions import TransactionsProducer
+from core.tests import MockCurrencyConvertorMixin
+
+from ..models import Transaction
+from .base import BaseTestCase, IncomeOutcomeCategoriesMixin
+
+
+class TransactionsProducerTests(
+    MockCurrencyConvertorMixin, IncomeOutcomeCategoriesMixin, BaseTestCase
+):
+    def setUp(self):
+        super().setUp()
+        self.producer = TransactionsProducer(MagicMock(Publisher))
+
+    def _get_sent_transactions(self):
+        self.producer.send()
+        message = self.producer.publisher.add_message.call_args.args[0]
+        return json.loads(message.body)
+
+    def test_serialized_transaction(self):
+        """Transaction must be serialized with amount in USD."""
+        transaction = self.create_transaction(
+            category=self.outcome_category, amount=150, currency=CurrencyCode.EUR
+        )
+        self.producer.add_transactions(Transaction.objects.all())
+        self.assertListEqual(
+            self._get_sent_transactions(),
+            [
+                {
+                    "transaction_id": transaction.id,
+                    "account_id": self.account.id,
+                    "transaction_type": "OUT",
+                    "amount": str(-transaction.amount_decimal * self.CONVERSION_RATE),
+                    "transaction_time": transaction.transaction_time.isoformat(),
+                }
+            ],
+        )
+
+    def test_queries_number(self):
+        """Categories must be loaded with a single query."""
+        for category in (self.income_category, self.outcome_category):
+            self.create_transactions_batch(10, category=category)
+        transactions = list(Transaction.objects.all())
+        with self.assertNumQueries(1):
+            self.producer.add_transactions(transactions)
+        with self.assertNumQueries(1):
+            self.producer.add_transactions(
+                Transaction.objects.select_related("category")
+            )
+
+    def test_rate_per_currency(self):
+        """Amounts must be converted with one call per currency."""
+        for currency in (CurrencyCode.EUR, CurrencyCode.USD, CurrencyCode.EUR):
+            self.create_transactions_batch(
+                5, category=self.income_category, currency=currency
+            )
+        self.converter_mock.reset_mock()
+        self.producer.add_transactions(Transaction.objects.all())
+        self.assertEqual(self.converter_mock.convert_many.call_count, 2)
+        self.converter_mock.convert.assert_not_called()
+
+    def _get_sent_messages(self):
+        return {
+            call.args[0].routing_key: json.loads(call.args[0].body)
+            for call in self.producer.publisher.add_message.call_args_list
+        }
+
+    def test_coalesce_created(self):
+        """Updates of created transaction must be sent as a single creation."""
+        transaction = self.create_transaction(category=self.income_category)
+        self.producer.add_transactions([transaction])
+        transaction.amount = 777
+        self.producer.update_transactions([transaction])
+        self.producer.send()
+        messages = self._get_sent_messages()
+        self.assertListEqual(list(messages), ["transaction.event.created"])
+        self.assertEqual(len(messages["transaction.event.created"]), 1)
+        self.assertEqual(
+            messages["transaction.event.created"][0]["amount"],
+            str(transaction.amount_decimal * self.CONVERSION_RATE),
+        )
+
+    def test_coalesce_deleted(self):
+        """Created and deleted transaction mustn't be sent, updated one is deleted."""
+        created, updated = self.create_transactions_batch(2)
+        self.producer.add_transactions([created])
+        self.producer.update_transactions([updated])
+        self.producer.delete_transactions([created.id, updated.id])
+        self.producer.send()
+        self.assertDictEqual(
+            self._get_sent_messages(), {"transaction.event.deleted": [updated.id]}
+        )
+
+    def test_rolled_back(self):
+        """Events of rolled back transaction must be dropped."""
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with db_transaction.atomic():
+                    self.producer.delete_transactions([1])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.producer.delete_transactions([2])
+        self.assertDictEqual(
+            self._get_sent_messages(), {"transaction.event.deleted": [2]}
+        )
+
+    def test_sent_on_commit(self):
+        """Unsent events must be published after commit."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.producer.delete_transactions([1])
+            self.producer.publisher.publish.assert_not_called()
+        for callback in callbacks:
+            callback()
+        self.producer.publisher.publish.assert_called_once()
+        self.producer.send()
+        self.producer.publisher.publish.assert_called_once()
+
+    def test_columnar_encoder(self):
+        """Columnar events must be decoded into the original layout."""
+        self.create_transaction(category=self.income_category)
+        self.create_transaction(category=self.outcome_category)
+        self.producer.add_transactions(Transaction.objects.all())
+        expected = self._get_sent_transactions()
+        for encoder in (ColumnarJsonEncoder(), MsgpackEncoder()):
+            producer = TransactionsProducer(MagicMock(Publisher), encoder)
+            producer.add_transactions(Transaction.objects.all())
+            producer.send()
+            message = producer.publisher.add_message.call_args.args[0]
+            self.assertEqual(message.content_type, encoder.content_type)
+            self.assertListEqual(
+                decode_transactions(message.body, message.content_type), expected
+            )
+
+    def test_send_users_transactions_command(self):
+        """Command must send all transactions of provided accounts."""
+        self.create_transactions_batch(10, category=self.income_category)
+        self.transactions_producer.clear()
+        with self.assertNumQueries(2):
+            call_command("send_users_transactions", self.account.id, stdout=StringIO())
+        message = self.publisher_mock.add_message.call_args.args[0]
+        self.assertEqual(len(json.loads(message.body)), 10)
+
+    def test_send_users_transactions_chunks(self):
+        """Command must send transactions in messages of provided size."""
+        self.create_transactions_batch(10, category=self.income_category)
+        self.transactions_producer.clear()
+        call_command(
+            "send_users_transactions",
+            self.account.id,
+            chunk_size=3,
+            stdout=StringIO(),
+        )
+        self.assertListEqual(
+            [
+                len(json.loads(call.args[0].body))
+                for call in self.publisher_mock.add_message.call_args_list
+            ],
+            [3, 3, 3, 1],
+        )
+
+
+class OutboxTransactionsProducerTests(
+    MockCurrencyConvertorMixin, IncomeOutcomeCategoriesMixin, BaseTestCase
+):
+    def setUp(self):
+        super().setUp()
+        self.outbox_mock = MagicMock(Outbox)
+        self.producer = TransactionsProducer(
+            OutboxPublisher(self.outbox_mock, ExchangeConfig("test_exchange", "topic"))
+        )
+
+    def _get_stored_messages(self):
+        return {
+            message.routing_key: json.loads(bytes(message.body))
+            for message in OutboxMessage.objects.all()
+        }
+
+    def test_stored_before_commit(self):
+        """Events must be stored in the outbox within the transaction."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producer.delete_transactions([1])
+            self.assertDictEqual(
+                self._get_stored_messages(), {"transaction.event.deleted": [1]}
+            )
+            self.outbox_mock.notify.assert_not_called()
+        self.outbox_mock.notify.assert_called_once()
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_coalesced(self):
+        """Stored events must be coalesced once they are sent."""
+        created, updated = self.create_transactions_batch(2)
+        self.producer.add_transactions([created])
+        self.producer.update_transactions([updated])
+        self.producer.delete_transactions([created.id, updated.id])
+        self.producer.send()
+        self.assertDictEqual(
+            self._get_stored_messages(), {"transaction.event.deleted": [updated.id]}
+        )
+
+    def test_sent_events_kept(self):
+        """Events recorded after sending mustn't replace sent ones."""
+        self.producer.delete_transactions([1])
+        self.producer.send()
+        self.producer.delete_transactions([2])
+        self.assertListEqual(
+            sorted(
+                json.loads(bytes(body))
+                for body in OutboxMessage.objects.values_list("body", flat=True)
+            ),
+            [[1], [2]],
+        )
+
+    def test_rolled_back_savepoint(self):
+        """Events of rolled back savepoint must be dropped with their rows."""
+        self.producer.delete_transactions([1])
+        try:
+            with db_transaction.atomic():
+                self.producer.delete_transactions([2])
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.producer.delete_transactions([3])
+        self.producer.send()
+        self.assertDictEqual(
+            self._get_stored_messages(), {"transaction.event.deleted": [1, 3]}
+        )
+
+    def test_writes_number(self):
+        """Every recorded event must be stored once until sending."""
+        for events_number in (10, 20):
+            with CaptureQueriesContext(connection) as context:
+                for transaction_id in range(events_number):
+                    self.producer.delete_transactions([transaction_id])
+            self.assertEqual(
+                sum("core_outboxmessage" in query["sql"] for query in context),
+                events_number,
+            )
+            self.producer.send()
+
+    def test_clear(self):
+        """Unsent events must be removed from the outbox."""
+        self.producer.delete_transactions([1])
+        self.producer.clear()
+        self.assertFalse(OutboxMessage.objects.exists())
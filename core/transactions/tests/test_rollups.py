@@ -0,0 +1,195 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from django.core.management import call_command
+from django.urls import resolve, reverse
+from rest_framework.test import force_authenticate
+
+from core.constants import CurrencyCode
+from core.tests import MockCurrencyConvertorMixin
+
+from ..filters import full_days_range
+from ..models import Transaction, TransactionRollup
+from ..services import compute_total
+from .base import BaseSummaryViewTestCase, BaseTestCase, IncomeOutcomeCategoriesMixin
+
+
+def _rollups_state():
+    return set(
+        TransactionRollup.objects.values_list(
+            "account", "category", "currency", "day", "amount", "transaction_count"
+        )
+    )
+
+
+class TransactionRollupTests(IncomeOutcomeCategoriesMixin, BaseTestCase):
+    def _test_rollups_consistent(self):
+        state = _rollups_state()
+        TransactionRollup.objects.rebuild()
+        self.assertSetEqual(state, _rollups_state())
+
+    def test_create(self):
+        """Rollups must include created transactions."""
+        self.create_transactions_batch(10, category=self.income_category)
+        self._test_rollups_consistent()
+
+    def test_update(self):
+        """Rollups must reflect changes of transactions."""
+        transaction = self.create_transaction(
+            category=self.income_category, currency=CurrencyCode.USD
+        )
+        transaction.amount += 100
+        transaction.currency = CurrencyCode.EUR
+        transaction.category = self.outcome_category
+        transaction.transaction_time -= timedelta(days=3)
+        transaction.save()
+        self._test_rollups_consistent()
+
+    def test_update_reloaded(self):
+        """Rollups must reflect changes of transactions loaded from database."""
+        self.create_transactions_batch(5, category=self.income_category)
+        for transaction in Transaction.objects.all():
+            transaction.amount += 1
+            transaction.save()
+        self._test_rollups_consistent()
+
+    def test_update_refreshed(self):
+        """Rollups must reflect changes of transactions refreshed from database."""
+        transaction, _ = self.create_transactions_batch(
+            2,
+            category=self.income_category,
+            currency=CurrencyCode.USD,
+            transaction_time=datetime(2023, 1, 1, tzinfo=timezone.utc),
+        )
+        stale_transaction = Transaction.objects.get(pk=transaction.pk)
+        changed_transaction = Transaction.objects.get(pk=transaction.pk)
+        changed_transaction.amount += 100
+        changed_transaction.save()
+        stale_transaction.refresh_from_db()
+        stale_transaction.comment = "Changed"
+        stale_transaction.save()
+        self._test_rollups_consistent()
+
+    def test_delete(self):
+        """Rollups of deleted transactions must be removed."""
+        transactions = self.create_transactions_batch(5, category=self.income_category)
+        for transaction in transactions:
+            transaction.delete()
+        self.assertFalse(TransactionRollup.objects.exists())
+
+    def test_delete_category(self):
+        """Rollups must be removed along with category."""
+        subcategory = self.create_category(parent_category=self.income_category)
+        self.create_transactions_batch(5, category=subcategory)
+        with patch.object(
+            TransactionRollup.objects, "remove_transactions"
+        ) as remove_mock:
+            self.income_category.delete()
+        remove_mock.assert_not_called()
+        self.assertFalse(TransactionRollup.objects.exists())
+
+    def test_rebuild_command(self):
+        """Command must recreate rollups."""
+        self.create_transactions_batch(5, category=self.income_category)
+        state = _rollups_state()
+        TransactionRollup.objects.all().delete()
+        call_command("rebuild_transaction_rollups", stdout=StringIO())
+        self.assertSetEqual(state, _rollups_state())
+
+
+class FullDaysRangeTests(BaseTestCase):
+    def test_aligned(self):
+        start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2023, 1, 5, tzinfo=timezone.utc)
+        self.assertTupleEqual(full_days_range(slice(start, end)), (start, end))
+
+    def test_not_aligned(self):
+        start = datetime(2023, 1, 1, 12, tzinfo=timezone.utc)
+        end = datetime(2023, 1, 5, 12, tzinfo=timezone.utc)
+        self.assertTupleEqual(
+            full_days_range(slice(start, end)),
+            (
+                datetime(2023, 1, 2, tzinfo=timezone.utc),
+                datetime(2023, 1, 5, tzinfo=timezone.utc),
+            ),
+        )
+
+    def test_unbounded(self):
+        self.assertTupleEqual(full_days_range(None), (None, None))
+
+
+class RollupSummaryViewTests(
+    MockCurrencyConvertorMixin, IncomeOutcomeCategoriesMixin, BaseSummaryViewTestCase
+):
+    def setUp(self):
+        super().setUp()
+        now = datetime(2023, 6, 15, 12, tzinfo=timezone.utc)
+        for hours in range(0, 24 * 10, 7):
+            self.create_transaction(
+                category=self.income_category,
+                transaction_time=now - timedelta(hours=hours),
+            )
+            self.create_transaction(
+                category=self.outcome_category,
+                transaction_time=now - timedelta(hours=hours, minutes=30),
+            )
+
+    def test_time_ranges(self):
+        """Total must be the same as computed from transactions."""
+        for after, before in (
+            (None, None),
+            ("2023-06-10T00:00:00Z", "2023-06-14T00:00:00Z"),
+            ("2023-06-09T05:30:00Z", "2023-06-13T17:45:00Z"),
+            ("2023-06-12T01:00:00Z", "2023-06-12T23:00:00Z"),
+            ("2023-06-08T00:00:00Z", None),
+            (None, "2023-06-11T06:00:00Z"),
+        ):
+            with self.subTest(after=after, before=before):
+                params = {}
+                transactions = Transaction.objects.filter(account=self.account)
+                if after:
+                    params["transaction_time_after"] = after
+                    transactions = transactions.filter(transaction_time__gte=after)
+                if before:
+                    params["transaction_time_before"] = before
+                    transactions = transactions.filter(transaction_time__lte=before)
+                expected_total = compute_total(
+                    transactions, self.account.default_currency
+                )
+                self._test_total_value(
+                    "{}?{}".format(reverse("transaction-summary"), urlencode(params)),
+                    float(expected_total),
+                )
+
+    def test_conversion_rounding(self):
+        """Converted amounts must be rounded per transaction."""
+        self.converter_mock.convert.side_effect = lambda amount, *_: round(
+            amount * Decimal("1.5"), 2
+        )
+        self.create_transactions_batch(
+            2,
+            category=self.income_category,
+            amount=1,
+            currency=CurrencyCode.EUR,
+            transaction_time=datetime(2023, 5, 1, tzinfo=timezone.utc),
+        )
+        params = {
+            "transaction_time_after": "2023-05-01T00:00:00Z",
+            "transaction_time_before": "2023-05-02T00:00:00Z",
+        }
+        self._test_total_value(
+            "{}?{}".format(reverse("transaction-summary"), urlencode(params)), 0.04
+        )
+
+    def test_queries_number(self):
+        """Summary must be computed with one query per source."""
+        path = reverse("transaction-summary")
+        request = self.request_factory.get(
+            path, {"transaction_time_after": "2023-06-10T00:00:00Z"}
+        )
+        force_authenticate(request, self.account)
+        with self.assertNumQueries(2):
+            resolve(path).func(request)
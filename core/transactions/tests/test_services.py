@@ -1,9 +1,18 @@
 from decimal import Decimal
 
+from django.core.cache import cache
+
 from core.constants import CurrencyCode
 from core.tests import MockCurrencyConvertorMixin
 
-from ..services import compute_total
+from ..models import Transaction
+from ..services import (
+    _iter_subtotals,
+    bump_account_version,
+    compute_total,
+    get_account_version,
+    invalidate_cached_responses,
+)
 from ..utils import get_all_subcategories, get_all_transactions
 from .base import BaseTestCase, IncomeOutcomeCategoriesMixin
 
@@ -64,6 +73,58 @@ class ComputeTotalTestCase(MockCurrencyConvertorMixin, IncomeOutcomeCategoriesMi
         total = compute_total(usd_transactions + byn_transactions, CurrencyCode.BYN)
         self.assertEqual(total, Decimal("50") * self.CONVERSION_RATE + Decimal("100"))
 
+    def test_conversion_rounding(self):
+        """Every transaction must be rounded after conversion."""
+        self.converter_mock.convert.side_effect = lambda amount, *_: round(
+            amount * Decimal("1.5"), 2
+        )
+        transactions = self.create_transactions_batch(
+            2, category=self.income_category, amount=1, currency=CurrencyCode.EUR
+        )
+        self.assertEqual(compute_total(transactions, CurrencyCode.BYN), Decimal("0.04"))
+        self.assertEqual(
+            compute_total(Transaction.objects.all(), CurrencyCode.BYN),
+            Decimal("0.04"),
+        )
+
+    def test_queryset_total(self):
+        """Must return the same total for a QuerySet as for a list."""
+        self.create_transactions_batch(
+            10, category=self.income_category, amount=500, currency=CurrencyCode.USD
+        )
+        self.create_transactions_batch(
+            7, category=self.outcome_category, amount=150, currency=CurrencyCode.EUR
+        )
+        transactions = Transaction.objects.filter(account=self.account)
+        self.assertEqual(
+            compute_total(transactions, CurrencyCode.EUR),
+            compute_total(list(transactions), CurrencyCode.EUR),
+        )
+
+    def test_output_currency_summed(self):
+        """Amounts in output currency mustn't be grouped by value."""
+        for amount in range(1, 11):
+            self.create_transaction(
+                category=self.income_category, amount=amount, currency=CurrencyCode.USD
+            )
+        subtotals = [(CurrencyCode.USD, self.income_category.transaction_type, 55, 10)]
+        queryset = self.account.transaction_set.all()
+        for transactions in (queryset, list(queryset)):
+            with self.subTest(transactions=type(transactions)):
+                self.assertListEqual(
+                    list(_iter_subtotals(transactions, CurrencyCode.USD)),
+                    subtotals,
+                )
+
+    def test_queryset_queries_number(self):
+        """Must aggregate a QuerySet with a single query."""
+        self.create_transactions_batch(20, category=self.income_category)
+        self.create_transactions_batch(20, category=self.outcome_category)
+        with self.assertNumQueries(1):
+            compute_total(
+                Transaction.objects.filter(account=self.account), CurrencyCode.USD
+            )
+
 
 class GetAllSubcategoriesTestCase(BaseTestCase):
     def setUp(self):
@@ -104,6 +165,31 @@ class GetAllSubcategoriesTestCase(BaseTestCase):
         subcategories = get_all_subcategories(self.category)
         self.assertEqual(subcategories.count(), 305)
 
+    def test_deep_tree(self):
+        """Must return subcategories at any depth."""
+        parent_category = self.category
+        for _ in range(8):
+            parent_category = self.create_category(parent_category=parent_category)
+        subcategories = get_all_subcategories(self.category)
+        self.assertEqual(subcategories.count(), 8)
+
+    def test_move_subtree(self):
+        """Moved subtree must be listed only under the new parent."""
+        subcategory = self.create_category(parent_category=self.category)
+        self.create_categories_batch(3, parent_category=subcategory)
+        new_parent_category = self.create_category()
+        subcategory.parent_category = new_parent_category
+        subcategory.save()
+        self.assertFalse(get_all_subcategories(self.category))
+        self.assertEqual(get_all_subcategories(new_parent_category).count(), 4)
+
+    def test_delete_subtree(self):
+        """Deleted subcategories mustn't be listed."""
+        subcategory = self.create_category(parent_category=self.category)
+        self.create_categories_batch(3, parent_category=subcategory)
+        subcategory.delete()
+        self.assertFalse(get_all_subcategories(self.category))
+
 
 class GetAllTransactionsTestCase(BaseTestCase):
     def setUp(self):
@@ -131,3 +217,26 @@ class GetAllTransactionsTestCase(BaseTestCase):
                 self.create_transactions_batch(5, category=subcategory)
         transactions = get_all_transactions(self.category)
         self.assertEqual(transactions.count(), 190)
+
+
+class AccountVersionTestCase(BaseTestCase):
+    def test_bump(self):
+        """Version must change on each bump."""
+        version = get_account_version(self.account.id)
+        bump_account_version(self.account.id)
+        self.assertEqual(get_account_version(self.account.id), version + 1)
+
+    def test_evicted(self):
+        """Evicted version mustn't start over from the same value."""
+        version = get_account_version(self.account.id)
+        cache.clear()
+        bump_account_version(self.account.id)
+        self.assertGreater(get_account_version(self.account.id), version)
+
+    def test_bump_after_commit(self):
+        """Version must be bumped again after commit."""
+        version = get_account_version(self.account.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_cached_responses(self.account.id)
+            self.assertEqual(get_account_version(self.account.id), version + 1)
+        self.assertEqual(get_account_version(self.account.id), version + 2)
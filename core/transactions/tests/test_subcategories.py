@@ -45,7 +45,7 @@ class TransactionSubcategoryViewTests(BaseViewTestCase):
         """Correct number of queries must be performed."""
         self.create_categories_batch(10, parent_category=self.parent_category)
         self._test_get_queries_number(
-            5,
+            3,
             reverse(
                 "transaction-category-subcategories", args=(self.parent_category.id,)
             ),
@@ -104,7 +104,7 @@ class TransactionSubcategoryViewTests(BaseViewTestCase):
     def test_add_subcategory_queries_number(self):
         """Correct number of queries must be performed."""
         self._test_post_queries_number(
-            3,
+            5,
             reverse(
                 "transaction-category-subcategories",
                 args=(self.parent_category.id,),
@@ -60,11 +60,20 @@ class TransactionCategorySummaryViewTests(
         for category in subcategories:
             self.create_transactions_batch(15, category=category)
         self._test_get_queries_number(
-            4,
+            3,
             reverse("transaction-category-summary", args=(self.outcome_category.id,)),
             category_id=self.outcome_category.id,
         )
 
+    def test_cached(self):
+        """Repeated request must only check the category."""
+        self.create_transactions_batch(5, category=self.income_category)
+        self._test_cached(
+            reverse("transaction-category-summary", args=(self.income_category.id,)),
+            1,
+            category_id=self.income_category.id,
+        )
+
     def test_filter_time(self):
         """Mustn't summarize transactions that don't match the filter."""
         with self._test_filter_time(
@@ -133,6 +142,48 @@ class TransactionCategoryStatsViewTest(
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()["categories"]), len(outcome_categories))
 
+    def test_include_subcategories(self):
+        """Category totals must include transactions of subcategories."""
+        category = self.create_category(transaction_type=TransactionType.OUTCOME)
+        for subcategory in self.create_categories_batch(3, parent_category=category):
+            for nested_category in self.create_categories_batch(
+                2, parent_category=subcategory
+            ):
+                self.create_transactions_batch(
+                    4,
+                    category=nested_category,
+                    amount=100,
+                    currency=self.account.default_currency,
+                )
+        response = self.client.get(reverse("transaction-category-stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["total"], -24)
+        self.assertListEqual(
+            response.json()["categories"], [{"id": category.id, "total": -24}]
+        )
+
+    def test_queries_number(self):
+        """Number of queries mustn't depend on the number of categories."""
+        for category in self.create_categories_batch(10):
+            for subcategory in self.create_categories_batch(
+                2, parent_category=category
+            ):
+                self.create_transactions_batch(3, category=subcategory)
+        self._test_get_queries_number(3, reverse("transaction-category-stats"))
+
+    def test_cached(self):
+        """Repeated request mustn't query database."""
+        self.create_transactions_batch(3)
+        self._test_cached(reverse("transaction-category-stats"))
+
+    def test_cache_invalidated_by_category(self):
+        """New category must appear in cached stats."""
+        response = self.client.get(reverse("transaction-category-stats"))
+        self.assertEqual(response.json()["categories"], [])
+        self.create_category()
+        response = self.client.get(reverse("transaction-category-stats"))
+        self.assertEqual(len(response.json()["categories"]), 1)
+
     def test_filter_time(self):
         """Mustn't summarize transactions that don't match the filter."""
         with self._test_filter_time(
@@ -159,7 +210,7 @@ class TransactionSummaryViewTests(
     def test_queries_number(self):
         """Correct number of queries must be performed."""
         self.create_transactions_batch(5)
-        self._test_get_queries_number(1, reverse("transaction-summary"))
+        self._test_get_queries_number(2, reverse("transaction-summary"))
 
     def test_currency(self):
         """Must use account's default currency."""
@@ -185,6 +236,31 @@ class TransactionSummaryViewTests(
             )
         )
 
+    def test_cached(self):
+        """Repeated request mustn't query database."""
+        self.create_transactions_batch(5)
+        self._test_cached(reverse("transaction-summary"))
+
+    def test_cache_params_order(self):
+        """Order of query params mustn't affect cache."""
+        path = reverse("transaction-summary")
+        self.client.get(f"{path}?transaction_type=IN&currency=USD")
+        self._test_get_queries_number(0, f"{path}?currency=USD&transaction_type=IN")
+
+    def test_cache_invalidated(self):
+        """Changes of transactions must be reflected in cached summary."""
+        transaction = self.create_transaction(
+            category=self.income_category,
+            amount=100,
+            currency=self.account.default_currency,
+        )
+        self._test_total_value(reverse("transaction-summary"), 1)
+        transaction.amount = 300
+        transaction.save()
+        self._test_total_value(reverse("transaction-summary"), 3)
+        transaction.delete()
+        self._test_total_value(reverse("transaction-summary"), 0)
+
     def test_filter_time(self):
         """Mustn't summarize transactions that don't match the filter."""
         with self._test_filter_time(reverse("transaction-summary")) as transaction_time:
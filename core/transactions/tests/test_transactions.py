@@ -1,12 +1,17 @@
 from datetime import timedelta
 
-from django.urls import reverse
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 from django.utils import timezone
 from rest_framework import status
+from rest_framework.test import force_authenticate
 
 from core.constants import CurrencyCode, TransactionType
+from core.tests import MockCurrencyConvertorMixin
 
-from ..models import Transaction
+from ..models import Transaction, TransactionRollup
 from .base import BaseViewTestCase, IncomeOutcomeCategoriesMixin
 from .factories import AccountFactory
 
@@ -43,6 +48,39 @@ class TransactionListViewTests(BaseViewTestCase):
         self.create_transactions_batch(5)
         self._test_get_queries_number(2, reverse("transaction-list"))
 
+    def test_cursor_pagination(self):
+        """Cursor pages must cover all transactions in order without repeats."""
+        transaction_time = timezone.now() - timedelta(days=1)
+        transactions = self.create_transactions_batch(
+            15, transaction_time=transaction_time
+        ) + self.create_transactions_batch(10)
+        ids = []
+        url = reverse("transaction-list") + "?cursor=&limit=4"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids.extend(transaction["id"] for transaction in response.data["results"])
+            url = response.data["next"]
+        expected_ids = [
+            transaction.id
+            for transaction in sorted(
+                transactions,
+                key=lambda transaction: (transaction.transaction_time, transaction.id),
+                reverse=True,
+            )
+        ]
+        self.assertEqual(ids, expected_ids)
+
+    def test_cursor_queries_number(self):
+        """Cursor pagination mustn't count transactions."""
+        self.create_transactions_batch(5)
+        path = reverse("transaction-list")
+        request = self.request_factory.get(path, {"cursor": ""})
+        force_authenticate(request, self.account)
+        with self.assertNumQueries(1):
+            resolve(path).func(request)
+
 
 class TransactionDetailsViewTests(BaseViewTestCase):
     def test_transaction_not_found(self):
@@ -118,6 +156,14 @@ class TransactionDetailsViewTests(BaseViewTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertLessEqual(request_body.items(), response.json().items())
 
+    def test_update_tiny_amount(self):
+        """Must response an error if amount rounds to zero."""
+        transaction = self.create_transaction(currency=CurrencyCode.USD)
+        response = self.client.patch(
+            reverse("transaction-detail", args=(transaction.id,)), {"amount": "0.001"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_updated_transaction_notification(self):
         """Updated transaction must be sent to notifications service."""
         transaction = self.create_transaction()
@@ -132,6 +178,7 @@ class TransactionDetailsViewTests(BaseViewTestCase):
     def test_delete_transaction(self):
         """Transaction must be successfully deleted."""
         transaction = self.create_transaction()
+        self.transactions_producer.clear()
         response = self.client.delete(
             reverse("transaction-detail", args=(transaction.id,))
         )
@@ -142,6 +189,7 @@ class TransactionDetailsViewTests(BaseViewTestCase):
     def test_deleted_transaction_notification(self):
         """Deleted transaction id must be sent to notifications service."""
         transaction = self.create_transaction()
+        self.transactions_producer.clear()
         response = self.client.delete(
             reverse("transaction-detail", args=(transaction.id,))
         )
@@ -168,13 +216,25 @@ class CategorizedTransactionViewTests(IncomeOutcomeCategoriesMixin, BaseViewTest
         ):
             self.create_transactions_batch(10, category=subcategory)
         self._test_get_queries_number(
-            5,
+            3,
             reverse(
                 "transaction-category-transactions", args=(self.income_category.id,)
             ),
             category_id=self.income_category.id,
         )
 
+    def test_list_transactions_cursor(self):
+        """Category transactions must support cursor pagination."""
+        category = self.create_category()
+        self.create_transactions_batch(5, category=category)
+        response = self.client.get(
+            reverse("transaction-category-transactions", args=(category.id,)),
+            {"cursor": "", "limit": 3},
+        )
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertIsNotNone(response.data["next"])
+        self.assertNotIn("count", response.data)
+
     def test_list_transactions_recursive(self):
         """Response must contain transactions of subcategories."""
         subcategories = self.create_categories_batch(
@@ -323,7 +383,7 @@ class CategorizedTransactionViewTests(IncomeOutcomeCategoriesMixin, BaseViewTest
         """Correct number of queries must be performed."""
         category = self.create_category()
         self._test_post_queries_number(
-            5,
+            7,
             reverse("transaction-category-transactions", args=(category.id,)),
             data={
                 "category": category.id,
@@ -334,6 +394,202 @@ class CategorizedTransactionViewTests(IncomeOutcomeCategoriesMixin, BaseViewTest
         )
 
 
+class TransactionBulkViewTests(
+    MockCurrencyConvertorMixin, IncomeOutcomeCategoriesMixin, BaseViewTestCase
+):
+    def _post(self, data):
+        return self.client.post(reverse("transaction-bulk"), data, format="json")
+
+    def _create_data(self, size, category=None):
+        return [
+            {
+                "category": (category or self.income_category).id,
+                "amount": f"{number + 1}.50",
+                "currency": CurrencyCode.USD,
+            }
+            for number in range(size)
+        ]
+
+    def test_create(self):
+        """Transactions must be created with categories from request."""
+        response = self._post(
+            {
+                "create": self._create_data(2)
+                + self._create_data(1, self.outcome_category)
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        created = response.json()["created"]
+        self.assertListEqual(
+            [item["transaction_type"] for item in created],
+            [TransactionType.INCOME] * 2 + [TransactionType.OUTCOME],
+        )
+        self.assertEqual(
+            Transaction.objects.filter(
+                id__in=[item["id"] for item in created], account=self.account
+            ).count(),
+            3,
+        )
+
+    def test_update(self):
+        """Only provided fields must be changed."""
+        transaction = self.create_transaction(
+            category=self.income_category, amount=1000, currency=CurrencyCode.USD
+        )
+        other_transaction = self.create_transaction(category=self.income_category)
+        response = self._post(
+            {
+                "update": [
+                    {"id": transaction.id, "amount": "20", "currency": "EUR"},
+                    {
+                        "id": other_transaction.id,
+                        "category": self.outcome_category.id,
+                        "comment": "Moved",
+                    },
+                ]
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.amount, 2000)
+        self.assertEqual(transaction.currency, CurrencyCode.EUR)
+        other_transaction.refresh_from_db()
+        self.assertEqual(other_transaction.category, self.outcome_category)
+        self.assertEqual(other_transaction.comment, "Moved")
+        self.assertEqual(
+            response.json()["updated"][1]["transaction_type"], TransactionType.OUTCOME
+        )
+
+    def test_delete(self):
+        """Transactions must be deleted."""
+        transactions = self.create_transactions_batch(3)
+        response = self._post({"delete": [transactions[0].id, transactions[1].id]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(
+            list(Transaction.objects.values_list("id", flat=True)),
+            [transactions[2].id],
+        )
+
+    def test_rollups(self):
+        """Rollups must stay consistent with transactions."""
+        transactions = self.create_transactions_batch(3, category=self.income_category)
+        self._post(
+            {
+                "create": self._create_data(3),
+                "update": [
+                    {"id": transactions[0].id, "category": self.outcome_category.id},
+                    {"id": transactions[1].id, "amount": "1000"},
+                ],
+                "delete": [transactions[2].id],
+            }
+        )
+        rollups = TransactionRollup.objects.values_list(
+            "category", "currency", "day", "amount", "transaction_count"
+        )
+        state = set(rollups)
+        TransactionRollup.objects.rebuild()
+        self.assertSetEqual(state, set(rollups))
+
+    def test_other_account(self):
+        """Mustn't change anything if any object belongs to other account."""
+        other_category = self.create_category(account=AccountFactory())
+        other_transaction = self.create_transaction(account=other_category.account)
+        response = self._post(
+            {
+                "create": self._create_data(1) + self._create_data(1, other_category),
+                "update": [{"id": other_transaction.id, "comment": "Changed"}],
+                "delete": [other_transaction.id + 1000],
+            }
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()
+        self.assertDictEqual(errors["create"][0], {})
+        self.assertIn("category", errors["create"][1])
+        self.assertIn("id", errors["update"][0])
+        self.assertIn("0", errors["delete"])
+        self.assertFalse(Transaction.objects.filter(account=self.account).exists())
+
+    def test_duplicate_ids(self):
+        """Transaction mustn't be changed twice in a batch."""
+        transaction = self.create_transaction()
+        response = self._post(
+            {"update": [{"id": transaction.id}], "delete": [transaction.id]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_zero_amount(self):
+        """Amount must be checked with currency of stored transaction."""
+        transaction = self.create_transaction(currency=CurrencyCode.USD)
+        response = self._post({"update": [{"id": transaction.id, "amount": "0.001"}]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("amount", response.json()["update"][0])
+
+    @override_settings(TRANSACTIONS_BULK_MAX_SIZE=2)
+    def test_max_size(self):
+        """Must response an error if batch is too big."""
+        response = self._post({"create": self._create_data(3)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_notification(self):
+        """Changes must be published with one message per event type."""
+        transactions = self.create_transactions_batch(2)
+        self.transactions_producer.clear()
+        self._post(
+            {
+                "create": self._create_data(5),
+                "update": [{"id": transactions[0].id, "comment": "Changed"}],
+                "delete": [transactions[1].id],
+            }
+        )
+        self.assertListEqual(
+            sorted(
+                call.args[0].routing_key
+                for call in self.publisher_mock.add_message.call_args_list
+            ),
+            [
+                "transaction.event.created",
+                "transaction.event.deleted",
+                "transaction.event.updated",
+            ],
+        )
+        self.publisher_mock.publish.assert_called_once()
+
+    def test_queries_number(self):
+        """Number of queries mustn't depend on batch size within same rollups."""
+        self.create_transaction(
+            category=self.income_category,
+            currency=CurrencyCode.USD,
+            transaction_time=timezone.now(),
+        )
+        queries_numbers = []
+        for size in (2, 20):
+            transactions = self.create_transactions_batch(
+                size,
+                category=self.income_category,
+                currency=CurrencyCode.USD,
+                transaction_time=timezone.now() - timedelta(days=1),
+            )
+            request = self.request_factory.post(
+                reverse("transaction-bulk"),
+                {
+                    "create": self._create_data(size),
+                    "update": [
+                        {"id": transaction.id, "amount": "7"}
+                        for transaction in transactions[: size // 2]
+                    ],
+                    "delete": [
+                        transaction.id for transaction in transactions[size // 2 :]
+                    ],
+                },
+                format="json",
+            )
+            force_authenticate(request, self.account)
+            with CaptureQueriesContext(connection) as context:
+                resolve(request.path).func(request)
+            queries_numbers.append(len(context))
+        self.assertEqual(queries_numbers[0], queries_numbers[1])
+
+
 class TransactionFilterTests(IncomeOutcomeCategoriesMixin, BaseViewTestCase):
     def test_transaction_type_filter(self):
         """Response must contain only transactions of provided type."""
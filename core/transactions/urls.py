@@ -18,6 +18,11 @@ urlpatterns = [
         views.TransactionDetailView.as_view(),
         name="transaction-detail",
     ),
+    path(
+        "transactions/bulk/",
+        views.TransactionBulkView.as_view(),
+        name="transaction-bulk",
+    ),
     path(
         "transactions/summary/",
         views.TransactionSummaryView.as_view(),
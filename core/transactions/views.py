@@ -5,8 +5,11 @@ from rest_framework.response import Response
 
 from . import services, utils
 from .filters import TransactionCategoryFilter, TransactionFilter
+from .pagination import TransactionCursorPagination
 from .permissions import IsOwnAccount
 from .serializers import (
+    TransactionBulkResultSerializer,
+    TransactionBulkSerializer,
     TransactionCategorySerializer,
     TransactionCategoryUpdateSerializer,
     TransactionSerializer,
@@ -22,6 +25,17 @@ class BaseViewMixin:
         filters.OrderingFilter,
         filters.SearchFilter,
     )
+    cursor_pagination_class = None
+
+    @property
+    def paginator(self):
+        if (
+            self.cursor_pagination_class
+            and self.request is not None
+            and self.cursor_pagination_class.is_requested(self.request)
+        ):
+            self.pagination_class = self.cursor_pagination_class
+        return super().paginator
 
 
 class TransactionCategoryViewSet(BaseViewMixin, viewsets.ModelViewSet):
@@ -61,7 +75,11 @@ class TransactionCategoryViewSet(BaseViewMixin, viewsets.ModelViewSet):
         categories = self.filter_queryset(self.get_queryset())
         if "parent_category" not in request.query_params:
             categories = categories.filter(parent_category__isnull=True)
-        return services.stats_response(request, categories)
+        return services.cached_response(
+            request,
+            "stats",
+            lambda: services.stats_response(request, categories),
+        )
 
     @action(
         detail=True,
@@ -87,13 +105,16 @@ class TransactionCategoryViewSet(BaseViewMixin, viewsets.ModelViewSet):
     @action(
         serializer_class=TransactionSerializer,
         filterset_class=None,
+        cursor_pagination_class=TransactionCursorPagination,
         detail=True,
         methods=("get",),
         url_name="transactions",
     )
     def transactions(self, request, category_id=None):
         transactions = utils.get_all_transactions(self.get_object())
-        return self._paginated_response(transactions.order_by("-transaction_time"))
+        return self._paginated_response(
+            transactions.order_by(*TransactionCursorPagination.ordering)
+        )
 
     @transactions.mapping.post
     def add_transaction(self, request, category_id=None):
@@ -112,10 +133,19 @@ class TransactionCategoryViewSet(BaseViewMixin, viewsets.ModelViewSet):
         url_name="summary",
     )
     def summary(self, request, category_id=None):
+        category = self.get_object()
         transactions = TransactionFilter(
-            request.query_params, utils.get_all_transactions(self.get_object())
+            request.query_params,
+            utils.get_all_transactions(category),
+            request=request,
         ).qs
-        return services.summary_response(request, transactions)
+        return services.cached_response(
+            request,
+            f"category_summary_{category.id}",
+            lambda: services.summary_response(
+                request, transactions, utils.get_all_rollups(category)
+            ),
+        )
 
     def _paginated_response(self, queryset):
         page = self.paginate_queryset(queryset)
@@ -131,7 +161,8 @@ class TransactionViewMixin(BaseViewMixin):
     filterset_class = TransactionFilter
     search_fields = ("comment",)
     ordering_fields = ("transaction_time",)
-    ordering = ("-transaction_time",)
+    ordering = TransactionCursorPagination.ordering
+    cursor_pagination_class = TransactionCursorPagination
 
     def get_queryset(self):
         return self.request.user.transaction_set.select_related("category").all()
@@ -155,7 +186,25 @@ class TransactionDetailView(
         notify_transaction_changes()
 
 
+class TransactionBulkView(TransactionViewMixin, generics.GenericAPIView):
+    serializer_class = TransactionBulkSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = services.bulk_write_transactions(
+            request.user, **serializer.validated_data
+        )
+        return Response(TransactionBulkResultSerializer(changes).data)
+
+
 class TransactionSummaryView(TransactionViewMixin, generics.GenericAPIView):
     def get(self, request):
         transactions = self.filter_queryset(self.get_queryset())
-        return services.summary_response(request, transactions)
+        return services.cached_response(
+            request,
+            "summary",
+            lambda: services.summary_response(
+                request, transactions, request.user.transactionrollup_set.all()
+            ),
+        )
@@ -9,7 +9,6 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
@@ -27,9 +26,7 @@ application = ProtocolTypeRouter(
         "http": django_asgi_app,
         "websocket": AllowedHostsOriginValidator(
             JWTAuthMiddleware(
-                AuthMiddlewareStack(
-                    URLRouter([path("api/", URLRouter(websocket_urlpatterns))]),
-                ),
+                URLRouter([path("api/", URLRouter(websocket_urlpatterns))]),
             )
         ),
     }
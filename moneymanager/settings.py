@@ -163,6 +163,27 @@ STATIC_URL = "api/static/"
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    "exports": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": env.path("EXPORTS_ROOT", default=BASE_DIR / "exports"),
+        },
+    },
+    "imports": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": env.path("IMPORTS_ROOT", default=BASE_DIR / "imports"),
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -288,6 +309,22 @@ ALFA_BANK_NATIONAL_RATES_URL = env(
 
 NOTIFICATIONS_SERVICE_TOKEN_LENGTH = 32
 
+NOTIFICATIONS_OUTBOX_BATCH_SIZE = env.int("NOTIFICATIONS_OUTBOX_BATCH_SIZE", default=100)
+
+NOTIFICATIONS_TRANSACTIONS_ENCODING = env(
+    "NOTIFICATIONS_TRANSACTIONS_ENCODING", default="json"
+)
+
+TRANSACTIONS_BULK_MAX_SIZE = 1000
+
+HISTORY_MODE = env("HISTORY_MODE", default="full")
+
+HISTORY_BATCH_SIZE = env.int("HISTORY_BATCH_SIZE", default=500)
+
+HISTORY_RETENTION_DAYS = env.int("HISTORY_RETENTION_DAYS", default=365)
+
 DEFAULT_CHAT_GROUP = "public_chat"
 
 CHAT_CACHE_SIZE_LIMIT = 100
+
+CHAT_USER_CACHE_TIMEOUT = 60
@@ -0,0 +1,89 @@
+from django.test import SimpleTestCase
+
+from .utils import InjectionContainer
+
+
+class Service:
+    pass
+
+
+class OtherService:
+    pass
+
+
+class InjectionContainerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.container = InjectionContainer()
+        self.service = Service()
+        self.other_service = OtherService()
+        self.container[Service] = self.service
+        self.container[OtherService] = self.other_service
+
+    def test_missing_binding(self):
+        """KeyError must be raised for missing bindings."""
+        with self.assertRaises(KeyError):
+            self.container[int]
+
+    def test_invalid_key(self):
+        """TypeError must be raised for keys which aren't types."""
+        for key in ("service", [Service]):
+            with self.subTest(key=key), self.assertRaises(TypeError):
+                self.container[key]
+
+    def test_override(self):
+        """Overridden binding must be returned until reset."""
+        overridden_service = Service()
+        self.container.override(Service, overridden_service)
+        self.assertIs(self.container[Service], overridden_service)
+        self.container.reset_override()
+        self.assertIs(self.container[Service], self.service)
+
+    def test_inject(self):
+        """Missing parameters must be injected."""
+
+        @self.container.inject("service", "other_service")
+        def func(value: int, service: Service, other_service: OtherService):
+            return value, service, other_service
+
+        self.assertTupleEqual(func(1), (1, self.service, self.other_service))
+        other_service = OtherService()
+        self.assertTupleEqual(
+            func(1, other_service=other_service), (1, self.service, other_service)
+        )
+        self.assertTupleEqual(
+            func(1, self.service, other_service), (1, self.service, other_service)
+        )
+
+    def test_inject_keyword_only(self):
+        """Keyword-only parameters must be injected."""
+
+        @self.container.inject("service")
+        def func(*args, service: Service, **kwargs):
+            return args, service, kwargs
+
+        self.assertTupleEqual(func(1, a=2), ((1,), self.service, {"a": 2}))
+
+    def test_inject_override(self):
+        """Overridden binding must be injected."""
+
+        @self.container.inject("service")
+        def func(service: Service):
+            return service
+
+        overridden_service = Service()
+        self.container.override(Service, overridden_service)
+        self.assertIs(func(), overridden_service)
+
+    def test_inject_invalid_parameter(self):
+        """TypeError must be raised at decoration time for invalid parameters."""
+        with self.assertRaises(TypeError):
+
+            @self.container.inject("service")
+            def no_annotation(service):
+                pass
+
+        with self.assertRaises(TypeError):
+
+            @self.container.inject("service")
+            def positional_only(service: Service, /):
+                pass
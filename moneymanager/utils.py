@@ -10,54 +10,76 @@ _Bindings = dict[type, object]
 _T = TypeVar("_T")
 _P = ParamSpec("_P")
 
+_INJECTABLE_PARAMETER_KINDS = (
+    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+    inspect.Parameter.KEYWORD_ONLY,
+)
+
 
 class InjectionContainer:
     def __init__(self) -> None:
         self._lock = Lock()
         self._bindings: _Bindings = {}
         self._overridden_bindings: _Bindings = {}
+        self._resolved_bindings: _Bindings = {}
 
     def __getitem__(self, key: type[_T]) -> _T:
+        try:
+            return self._resolved_bindings[key]
+        except KeyError:
+            pass
+        except TypeError:
+            raise TypeError(f"{key} is not a valid type") from None
         if not inspect.isclass(key):
             raise TypeError(f"{key} is not a valid type")
-        with self._lock:
-            if key not in self._bindings:
-                raise KeyError(f"No binding found for type {key}")
-            return self._overridden_bindings.get(key) or self._bindings[key]
+        raise KeyError(f"No binding found for type {key}")
 
     def __setitem__(self, key: type[_T], value: _T) -> None:
         self._validate_binding(key, value)
         with self._lock:
             self._bindings[key] = value
+            self._update_resolved_bindings()
 
     def override(self, key: type[_T], value: _T) -> None:
         """Create temporary binding."""
         self._validate_binding(key, value)
         with self._lock:
             self._overridden_bindings[key] = value
+            self._update_resolved_bindings()
 
     def reset_override(self):
         """Reset all temporary bindings."""
         with self._lock:
             self._overridden_bindings.clear()
+            self._update_resolved_bindings()
 
     def inject(self, *params: str) -> Callable[[Callable[_P, _T]], Callable[_P, _T]]:
         """Return decorator that injects provided parameters."""
 
         def decorator(func: Callable[_P, _T]) -> Callable[_P, _T]:
             annotations = inspect.get_annotations(func)
+            parameters = list(inspect.signature(func).parameters.values())
+            injected_params: list[tuple[str, int, type]] = []
             for param_name in params:
                 if param_name not in annotations:
                     raise TypeError(f"No annotation found for parameter {param_name}")
+                param = next(param for param in parameters if param.name == param_name)
+                if param.kind not in _INJECTABLE_PARAMETER_KINDS:
+                    raise TypeError(f"Parameter {param_name} can't be injected")
+                position = (
+                    parameters.index(param)
+                    if param.kind is param.POSITIONAL_OR_KEYWORD
+                    else len(parameters)
+                )
+                key = self._extract_type(annotations[param_name])
+                injected_params.append((param_name, position, key))
 
             @functools.wraps(func)
             def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _T:
-                for param_name in params:
-                    call_args = inspect.signature(func).bind_partial(*args, **kwargs)
-                    if param_name not in call_args.arguments:
-                        key = self._extract_type(annotations[param_name])
-                        call_args.arguments[param_name] = self.__getitem__(key)
-                return func(*call_args.args, **call_args.kwargs)
+                for param_name, position, key in injected_params:
+                    if position >= len(args) and param_name not in kwargs:
+                        kwargs[param_name] = self.__getitem__(key)
+                return func(*args, **kwargs)
 
             return wrapper
 
@@ -72,6 +94,12 @@ class InjectionContainer:
             raise TypeError(f"Imported class isn't a subclass of {key}")
         self.__setitem__(key, factory(*args, **kwargs))
 
+    def _update_resolved_bindings(self) -> None:
+        self._resolved_bindings = {
+            key: self._overridden_bindings.get(key) or value
+            for key, value in self._bindings.items()
+        }
+
     def _validate_binding(self, key, value):
         if key is type:
             raise TypeError(f"Binding for {type} is ambiguous")